@@ -0,0 +1,317 @@
+"""Load test of widgets with many concurrent users.
+
+Every simulated user runs click scripts of all widgets against `FakeBot`,
+which emulates botx API latency and rate limits. With `--http` widgets send
+messages by real `Bot` through botx client and HTTP to `FakeBotxAPI`.
+
+    python benchmarks/loadtest.py --users 1000 --clicks 5 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+
+from botx import Bot, BubbleElement, Message, SendingMessage
+
+from pybotx_widgets.calendar import CalendarWidget
+from pybotx_widgets.carousel import CarouselWidget
+from pybotx_widgets.checklist import CheckListWidget
+from pybotx_widgets.checktable import CheckboxContent, ChecktableWidget
+from pybotx_widgets.pagination import PaginationWidget
+from pybotx_widgets.resources import strings
+from pybotx_widgets.state import decode_state
+from pybotx_widgets.testing import FakeBot, FakeBotxAPI, SentMessage, build_user
+from pybotx_widgets.undefined import undefined
+
+CAROUSEL_CONTENT = [f"Элемент {index}" for index in range(100)]
+CHECKLIST_CONTENT = [f"Пункт {index}" for index in range(20)]
+PAGES_COUNT = 30
+CHECKTABLE_FIELDS = 10
+CHECKTABLE_MAPPING = {index: f"Значение {index}" for index in range(5)}
+LOOP_LAG_INTERVAL = 0.01
+
+Handler = Callable[[Message, Any], Awaitable[Optional[UUID]]]
+BubbleFilter = Callable[[BubbleElement], bool]
+
+
+class Session:
+    """Simulated user who clicks widget bubbles."""
+
+    def __init__(self, api: FakeBot, latencies: Dict[str, List[float]]) -> None:
+        self.api = api
+        self.bot = api.message_bot
+        self.latencies = latencies
+        self.user = build_user()
+
+    async def open(self, name: str, body: str, handler: Handler) -> UUID:
+        """Send command which displays widget."""
+
+        started_at = time.perf_counter()
+        message = self.api.build_message(body, user=self.user)
+        message_id = await handler(message, self.bot)
+        self.latencies[name].append(time.perf_counter() - started_at)
+
+        assert message_id is not None
+        return message_id
+
+    async def click(
+        self, name: str, message_id: UUID, bubble_filter: BubbleFilter, handler: Handler
+    ) -> UUID:
+        """Click bubble of widget message."""
+
+        bubble = _find_bubble(self.api.messages[message_id], bubble_filter)
+
+        started_at = time.perf_counter()
+        message = self.api.click(message_id, bubble, user=self.user)
+        new_message_id = await handler(message, self.bot)
+        self.latencies[name].append(time.perf_counter() - started_at)
+
+        return new_message_id or message_id
+
+
+async def carousel_handler(message: Message, bot: Bot) -> Optional[UUID]:
+    widget = CarouselWidget(
+        CAROUSEL_CONTENT, "Выберите элемент", message=message, bot=bot, command="/car"
+    )
+    message_id = await widget.display()
+    if widget.is_value_selected:
+        await CarouselWidget.get_value(message, bot)
+
+    return message_id
+
+
+async def calendar_handler(message: Message, bot: Bot) -> Optional[UUID]:
+    widget = CalendarWidget(message=message, bot=bot, command="/cal")
+    message_id = await widget.display()
+    if widget.selected_date:
+        await CalendarWidget.get_value(message, bot)
+
+    return message_id
+
+
+async def checklist_handler(message: Message, bot: Bot) -> Optional[UUID]:
+    widget = CheckListWidget(
+        CHECKLIST_CONTENT, "Отметьте пункты", message=message, bot=bot, command="/chl"
+    )
+    return await widget.display()
+
+
+async def pagination_handler(message: Message, bot: Bot) -> Optional[UUID]:
+    content = [
+        SendingMessage.from_message(text=f"Страница {index}", message=message)
+        for index in range(PAGES_COUNT)
+    ]
+    widget = PaginationWidget(
+        content,
+        paginate_by=3,
+        delay_between_messages=0,
+        message=message,
+        bot=bot,
+        command="/pag",
+    )
+    return await widget.display()
+
+
+def build_checktable_handler() -> Handler:
+    fields: Dict[int, Any] = {field: undefined for field in range(CHECKTABLE_FIELDS)}
+
+    async def checktable_handler(  # noqa: WPS430
+        message: Message, bot: Bot
+    ) -> Optional[UUID]:
+        field = message.data.get("field")
+        if field is not None:
+            current_value = fields[field]
+            fields[field] = 0 if current_value is undefined else current_value + 1
+            fields[field] %= len(CHECKTABLE_MAPPING)
+
+        checkboxes = [
+            CheckboxContent(
+                label=f"Поле {field}",
+                command="/cht",
+                checkbox_value=value,
+                mapping=CHECKTABLE_MAPPING,
+                data={"field": field},
+            )
+            for field, value in fields.items()
+        ]
+        widget = ChecktableWidget(
+            checkboxes,
+            "Настройки",
+            "/cht_uncheck",
+            message=message,
+            bot=bot,
+            command="",
+        )
+        return await widget.display()
+
+    return checktable_handler
+
+
+async def run_user(session: Session, clicks: int) -> None:
+    """Run click scripts of all widgets."""
+
+    message_id = await session.open("carousel", "/car", carousel_handler)
+    for _ in range(clicks):
+        message_id = await session.click(
+            "carousel", message_id, _label_is(strings.RIGHT_ARROW), carousel_handler
+        )
+    await session.click(
+        "carousel", message_id, _label_in(CAROUSEL_CONTENT), carousel_handler
+    )
+
+    message_id = await session.open("calendar", "/cal", calendar_handler)
+    for _ in range(clicks):
+        message_id = await session.click(
+            "calendar", message_id, _label_is(strings.RIGHT_ARROW), calendar_handler
+        )
+    await session.click(
+        "calendar", message_id, _data_has("calendar_selected_date"), calendar_handler
+    )
+
+    message_id = await session.open("checklist", "/chl", checklist_handler)
+    for click in range(clicks):
+        message_id = await session.click(
+            "checklist",
+            message_id,
+            _label_is(f"{strings.CHECKBOX_UNCHECKED} {CHECKLIST_CONTENT[click]}"),
+            checklist_handler,
+        )
+
+    message_id = await session.open("pagination", "/pag", pagination_handler)
+    for _ in range(min(clicks, PAGES_COUNT // 3 - 1)):
+        message_id = await session.click(
+            "pagination",
+            message_id,
+            _label_starts(strings.RIGHT_ARROW),
+            pagination_handler,
+        )
+
+    checktable_handler = build_checktable_handler()
+    message_id = await session.open("checktable", "/cht", checktable_handler)
+    for click in range(clicks):
+        message_id = await session.click(
+            "checktable",
+            message_id,
+            _data_is("field", click % CHECKTABLE_FIELDS, "/cht"),
+            checktable_handler,
+        )
+
+
+async def monitor_loop_lag(lags: List[float]) -> None:
+    while True:  # noqa: WPS457
+        started_at = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lags.append(time.perf_counter() - started_at - LOOP_LAG_INTERVAL)
+
+
+async def run(args: argparse.Namespace) -> None:
+    api_cls = FakeBotxAPI if args.http else FakeBot
+    api = api_cls(latency=args.latency, rate_limit=args.rate_limit or None)
+    if isinstance(api, FakeBotxAPI):
+        await api.authorize()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    lags: List[float] = []
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    max_rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    lag_monitor = asyncio.ensure_future(monitor_loop_lag(lags))
+    started_at = time.perf_counter()
+    await asyncio.gather(
+        *(run_user(Session(api, latencies), args.clicks) for _ in range(args.users))
+    )
+    duration = time.perf_counter() - started_at
+    lag_monitor.cancel()
+    if isinstance(api, FakeBotxAPI):
+        await api.close()
+
+    max_rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    all_latencies = [latency for values in latencies.values() for latency in values]
+
+    print(f"users: {args.users}, clicks per widget: {args.clicks}")
+    throughput = len(all_latencies) / duration
+    print(f"duration: {duration:.2f}s, throughput: {throughput:.1f} req/s")
+    print(
+        f"api calls: sent {api.sent_count}, updated {api.updated_count}, "
+        f"throttled {api.throttled_count}"
+    )
+    print(_format_percentiles("all", all_latencies))
+    for name, values in latencies.items():
+        print(_format_percentiles(name, values))
+    print(_format_percentiles("loop lag", lags or [0]))
+    print(f"max rss growth: {(max_rss_after - max_rss_before) / 1024:.1f} MiB")
+
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        print(
+            f"traced memory: current {current / 2 ** 20:.1f} MiB, "
+            f"peak {peak / 2 ** 20:.1f} MiB"
+        )
+
+
+def _format_percentiles(name: str, values: List[float]) -> str:
+    if len(values) > 1:
+        percentiles = statistics.quantiles(values, n=100)
+        p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+    else:
+        p50 = p95 = p99 = values[0]
+
+    return (
+        f"{name:>10}: n={len(values)} p50={p50 * 1000:.1f}ms "
+        f"p95={p95 * 1000:.1f}ms p99={p99 * 1000:.1f}ms max={max(values) * 1000:.1f}ms"
+    )
+
+
+def _find_bubble(
+    sent_message: SentMessage, bubble_filter: BubbleFilter
+) -> BubbleElement:
+    for row in sent_message.bubbles:
+        for bubble in row:
+            if bubble_filter(bubble):
+                return bubble
+
+    raise LookupError("Bubble is not found")
+
+
+def _label_is(label: str) -> BubbleFilter:
+    return lambda bubble: bubble.label == label
+
+
+def _label_starts(prefix: str) -> BubbleFilter:
+    return lambda bubble: (bubble.label or "").startswith(prefix)
+
+
+def _label_in(labels: List[str]) -> BubbleFilter:
+    return lambda bubble: bubble.label in labels
+
+
+def _data_has(key: str) -> BubbleFilter:
+    return lambda bubble: key in decode_state(bubble.data)
+
+
+def _data_is(key: str, value: Any, command: str) -> BubbleFilter:
+    return lambda bubble: (
+        bubble.command == command and decode_state(bubble.data).get(key) == value
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100, help="concurrent users")
+    parser.add_argument("--clicks", type=int, default=5, help="clicks per widget")
+    parser.add_argument("--latency", type=float, default=0.05, help="API latency, s")
+    parser.add_argument("--rate-limit", type=float, default=0, help="API calls per s")
+    parser.add_argument("--tracemalloc", action="store_true", help="trace memory")
+    parser.add_argument("--http", action="store_true", help="send by real Bot")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
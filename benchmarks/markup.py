@@ -0,0 +1,92 @@
+"""Cost of building markup of widgets with many items.
+
+    python benchmarks/markup.py --items 1000 --repeat 20
+"""
+
+import argparse
+import time
+from typing import Callable, Dict
+
+from pybotx_widgets.base import Widget
+from pybotx_widgets.carousel import CarouselWidget
+from pybotx_widgets.checklist import CheckListWidget
+from pybotx_widgets.testing import FakeBot
+
+WidgetFactory = Callable[[int], Widget]
+
+BOT = FakeBot()
+
+
+def build_inline_carousel(items_count: int) -> Widget:
+    return CarouselWidget(
+        [f"Элемент {index}" for index in range(items_count)],
+        "Выберите элемент",
+        displayed_content_count=items_count,
+        message=BOT.build_message("/car"),
+        bot=BOT,
+        command="/car",
+    )
+
+
+def build_newline_carousel(items_count: int) -> Widget:
+    content = [f"Элемент {index}" for index in range(items_count // 2)]
+    content += [
+        (f"Элемент {index}", f"Элемент {index + 1}")
+        for index in range(items_count // 2, items_count, 2)
+    ]
+    return CarouselWidget(
+        content,
+        "Выберите элемент",
+        displayed_content_count=len(content),
+        inline=False,
+        message=BOT.build_message("/car"),
+        bot=BOT,
+        command="/car",
+    )
+
+
+def build_checklist(items_count: int) -> Widget:
+    content = [f"Пункт {index}" for index in range(items_count)]
+    return CheckListWidget(
+        content,
+        "Отметьте пункты",
+        message=BOT.build_message(
+            "/chl", metadata={"checklist_checked_items": content[::2]}
+        ),
+        bot=BOT,
+        command="/chl",
+    )
+
+
+FACTORIES: Dict[str, WidgetFactory] = {
+    "inline carousel": build_inline_carousel,
+    "newline carousel": build_newline_carousel,
+    "checklist": build_checklist,
+}
+
+
+def measure(name: str, factory: WidgetFactory, items_count: int, repeat: int) -> str:
+    duration = 0.0
+    for _ in range(repeat):
+        widget = factory(items_count)
+        started_at = time.perf_counter()
+        widget.add_markup()
+        duration += time.perf_counter() - started_at
+
+    return (
+        f"{name:>16}: {duration / repeat * 1000:.2f} ms/markup, "
+        f"{duration / repeat / items_count * 1e6:.2f} us/item"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000, help="items in markup")
+    parser.add_argument("--repeat", type=int, default=20, help="markups to build")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for name, factory in FACTORIES.items():
+        print(measure(name, factory, args.items, args.repeat))
@@ -0,0 +1,110 @@
+"""Memory footprint of widget instances.
+
+Widgets are built from callback messages like in handlers, but not displayed,
+e.g. widgets waiting for an answer or queued behind a slow botx API.
+
+    python benchmarks/memory.py --count 10000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from botx import Message, SendingMessage
+
+from pybotx_widgets.base import Widget
+from pybotx_widgets.calendar import CalendarWidget
+from pybotx_widgets.carousel import CarouselWidget
+from pybotx_widgets.checklist import CheckListWidget
+from pybotx_widgets.checktable import CheckboxContent, ChecktableWidget
+from pybotx_widgets.pagination import PaginationWidget
+from pybotx_widgets.testing import FakeBot
+
+CAROUSEL_CONTENT = [f"Элемент {index}" for index in range(100)]
+CHECKLIST_CONTENT = [f"Пункт {index}" for index in range(20)]
+PAGINATION_CONTENT = [
+    SendingMessage.from_message(
+        text=f"Страница {index}", message=FakeBot().build_message("")
+    )
+    for index in range(10)
+]
+
+WidgetFactory = Callable[[Message, FakeBot], Widget]
+
+
+def build_carousel(message: Message, bot: FakeBot) -> Widget:
+    return CarouselWidget(
+        CAROUSEL_CONTENT, "Выберите элемент", message=message, bot=bot, command="/car"
+    )
+
+
+def build_calendar(message: Message, bot: FakeBot) -> Widget:
+    return CalendarWidget(message=message, bot=bot, command="/cal")
+
+
+def build_checklist(message: Message, bot: FakeBot) -> Widget:
+    return CheckListWidget(
+        CHECKLIST_CONTENT, "Отметьте пункты", message=message, bot=bot, command="/chl"
+    )
+
+
+def build_pagination(message: Message, bot: FakeBot) -> Widget:
+    return PaginationWidget(
+        PAGINATION_CONTENT, 1, message=message, bot=bot, command="/pag"
+    )
+
+
+def build_checktable(message: Message, bot: FakeBot) -> Widget:
+    checkboxes = [CheckboxContent(label="Поле", command="/cht", checkbox_value=1)]
+    return ChecktableWidget(
+        checkboxes, "Настройки", "/cht_uncheck", message=message, bot=bot, command=""
+    )
+
+
+FACTORIES: Dict[str, WidgetFactory] = {
+    "carousel": build_carousel,
+    "calendar": build_calendar,
+    "checklist": build_checklist,
+    "pagination": build_pagination,
+    "checktable": build_checktable,
+}
+
+
+def measure(name: str, factory: WidgetFactory, count: int) -> str:
+    bot = FakeBot()
+    messages = [
+        bot.build_message("", metadata={"pybotx_widget": 1}) for _ in range(count)
+    ]
+    widgets: List[Any] = []
+
+    started_at = time.perf_counter()
+    for message in messages[: count // 2]:
+        widgets.append(factory(message, bot))
+    duration = time.perf_counter() - started_at
+
+    # memory is traced separately, because tracing slows down allocations
+    gc.collect()
+    tracemalloc.start()
+    for message in messages[count // 2 :]:
+        widgets.append(factory(message, bot))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (
+        f"{name:>10}: {current / (count - count // 2):.0f} B/instance, "
+        f"{duration / (count // 2) * 1e6:.1f} us/instance"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10000, help="widgets of each type")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for name, factory in FACTORIES.items():
+        print(measure(name, factory, args.count))
@@ -0,0 +1,97 @@
+"""Cost of resending packed page which needs more messages than were sent.
+
+Messages of previous page are cleared, so check fails if any of them keeps
+its content.
+
+    python benchmarks/packed_pagination.py --latency 0.05 --repeat 10
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+from uuid import UUID
+
+from botx import Message, SendingMessage
+
+from pybotx_widgets.pagination import MESSAGE_IDS_KEY, PaginationWidget
+from pybotx_widgets.resources import strings
+from pybotx_widgets.testing import FakeBot
+
+PAGINATE_BY = 10
+MAX_PACKED_LINES = 6
+# first page is packed into few messages, second one needs message per item
+SHORT_ITEMS = PAGINATE_BY
+LONG_ITEM_LINES = 5
+
+
+def build_widget(bot: FakeBot, message: Message) -> PaginationWidget:
+    content = [
+        SendingMessage.from_message(text=f"Пункт {index}", message=message)
+        for index in range(SHORT_ITEMS)
+    ]
+    content += [
+        SendingMessage.from_message(
+            text="\n".join([f"Пункт {index}"] * LONG_ITEM_LINES), message=message
+        )
+        for index in range(SHORT_ITEMS, SHORT_ITEMS + PAGINATE_BY)
+    ]
+    return PaginationWidget(
+        content,
+        PAGINATE_BY,
+        0,
+        max_packed_lines=MAX_PACKED_LINES,
+        message=message,
+        bot=bot,
+        command="/packed",
+    )
+
+
+async def resend(bot: FakeBot) -> float:
+    """Display first page, go to second one and check that first page is cleared."""
+
+    message = bot.build_message("/packed")
+    widget_id = await build_widget(bot, message).display()
+    sent_message = bot.messages[widget_id]
+    # ids are kept in metadata as strings after JSON serialization
+    previous_ids: List[UUID] = [
+        *map(UUID, sent_message.metadata[MESSAGE_IDS_KEY]),
+        widget_id,
+    ]
+
+    forward_bubble = sent_message.bubbles[0][-1]
+    callback = bot.click(widget_id, forward_bubble)
+    started_at = time.perf_counter()
+    await build_widget(bot, callback).display()
+    duration = time.perf_counter() - started_at
+
+    stale_ids = [
+        message_id
+        for message_id in previous_ids
+        if bot.messages[message_id].text != strings.EMPTY_MSG_SYMBOL
+    ]
+    if stale_ids:
+        raise SystemExit(f"Messages of previous page aren't cleared: {stale_ids}")
+
+    return duration
+
+
+async def main(latency: float, repeat: int) -> None:
+    bot = FakeBot(latency=latency)
+    duration = 0.0
+    for _ in range(repeat):
+        duration += await resend(bot)
+
+    print(f"resend of packed page: {duration / repeat * 1000:.2f} ms")  # noqa: WPS421
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05, help="API latency")
+    parser.add_argument("--repeat", type=int, default=10, help="resends to measure")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(main(args.latency, args.repeat))
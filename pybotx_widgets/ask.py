@@ -0,0 +1,151 @@
+"""Awaitable ask/answer API for widgets."""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional
+from uuid import UUID
+
+from botx import Message
+from botx.middlewares.base import BaseMiddleware
+from botx.typing import AsyncExecutor, Executor
+
+from pybotx_widgets.cache import TTLCache
+from pybotx_widgets.undefined import undefined
+
+if TYPE_CHECKING:
+    from pybotx_widgets.base import Widget  # noqa: WPS433
+
+ASK_MAX_PENDING = 10000
+ASK_TTL = 60 * 60
+
+
+class PendingAnswer:
+    """Widget which waits for an answer and future for this answer."""
+
+    def __init__(self, widget: "Widget", future: asyncio.Future) -> None:
+        self.widget = widget
+        self.future = future
+        #: ids of all messages of widget, e.g. pages of split widget
+        self.message_ids: List[UUID] = []
+        #: callbacks of one message are handled one by one, they share widget
+        self.lock = asyncio.Lock()
+
+
+class AskRegistry:
+    """Registry of widgets that wait for an answer.
+
+    Widgets are stored by ids of widget messages, so callback from any bubble of
+    these messages is routed to the waiting widget instead of the command handler.
+    """
+
+    def __init__(self, max_size: int = ASK_MAX_PENDING, ttl: float = ASK_TTL) -> None:
+        """
+        :param max_size - Max count of pending widgets, oldest are expired
+        :param ttl - Seconds after which pending widget is expired
+        """
+        self._pending: TTLCache[UUID, PendingAnswer] = TTLCache(
+            max_size=max_size, ttl=ttl, on_evict=_expire_answer
+        )
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def register(self, message_ids: Iterable[UUID], widget: "Widget") -> PendingAnswer:
+        """Register widget that waits for an answer.
+
+        :param message_ids - Ids of all messages of widget
+        """
+
+        future = asyncio.get_event_loop().create_future()
+        pending = PendingAnswer(widget, future)
+        self._add_messages(pending, message_ids)
+        return pending
+
+    def discard(self, message_ids: Iterable[UUID]) -> None:
+        """Stop waiting for an answer."""
+
+        for message_id in message_ids:
+            self._pending.pop(message_id)
+
+    async def dispatch(self, message: Message) -> bool:
+        """Handle callback from the waiting widget.
+
+        Navigation callbacks re-render widget, answer callbacks resolve the future.
+        Return `False` if message isn't related to any waiting widget.
+        """
+
+        message_id = message.source_sync_id
+        pending = self._pending.get(message_id) if message_id else None
+        if pending is None:
+            return False
+
+        async with pending.lock:
+            if pending.future.done():
+                # answer is received by concurrent callback
+                return True
+
+            widget = pending.widget
+            widget.rebind(message)
+
+            answer = await widget.get_answer()
+            if answer is undefined:
+                await widget.display()
+                # widget can be split into more pages after display
+                self._add_messages(pending, widget.sent_page_ids)
+                return True
+
+            self.discard(pending.message_ids)
+            pending.future.set_result(answer)
+
+        return True
+
+    def _add_messages(
+        self, pending: PendingAnswer, message_ids: Iterable[UUID]
+    ) -> None:
+        for message_id in message_ids:
+            if message_id not in pending.message_ids:
+                pending.message_ids.append(message_id)
+            self._pending.set(message_id, pending)
+
+
+class AskMiddleware(BaseMiddleware):
+    """Route callbacks of waiting widgets to the `AskRegistry`."""
+
+    def __init__(self, executor: Executor, registry: AskRegistry = None) -> None:
+        """
+        :param registry - Registry of waiting widgets, default is `ask_registry`
+        """
+        super().__init__(executor)
+        self.registry = registry or ask_registry
+
+    async def dispatch(self, message: Message, call_next: AsyncExecutor) -> None:
+        if await self.registry.dispatch(message):
+            return
+
+        await call_next(message)
+
+
+async def wait_answer(
+    widget: "Widget",
+    message_ids: Iterable[UUID],
+    timeout: Optional[float] = None,
+    registry: AskRegistry = None,
+) -> Any:
+    """Wait until answer for displayed widget will be received.
+
+    :param message_ids - Ids of all messages of widget
+    """
+
+    registry = registry or ask_registry
+    pending = registry.register(message_ids, widget)
+    try:
+        return await asyncio.wait_for(pending.future, timeout)
+    finally:
+        registry.discard(pending.message_ids)
+
+
+def _expire_answer(_message_id: UUID, pending: PendingAnswer) -> None:
+    if not pending.future.done():
+        pending.future.set_exception(asyncio.TimeoutError("Widget answer expired"))
+
+
+ask_registry = AskRegistry()
@@ -0,0 +1,179 @@
+"""Index of available dates for calendar widget."""
+
+from bisect import bisect_left, bisect_right
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+DateInterval = Tuple[date, date]
+DisabledDates = Iterable[Union[date, DateInterval]]
+
+
+class DateIntervals:
+    """Sorted set of disjoint date intervals with bisect lookup."""
+
+    def __init__(self, intervals: DisabledDates = ()) -> None:
+        """
+        :param intervals - Dates or (first, last) intervals, both ends included
+        """
+        self._starts: List[date] = []
+        self._ends: List[date] = []
+        self.update(intervals)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __contains__(self, day: object) -> bool:
+        if not isinstance(day, date):
+            return False
+
+        position = bisect_right(self._starts, day) - 1
+        return position >= 0 and day <= self._ends[position]
+
+    def update(self, intervals: DisabledDates) -> None:
+        """Add dates or intervals and merge overlapping ones."""
+
+        merged: List[DateInterval] = []
+        all_intervals = [*zip(self._starts, self._ends), *_as_intervals(intervals)]
+        for first, last in sorted(all_intervals):
+            if merged and (first - merged[-1][1]).days <= 1:
+                merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+            else:
+                merged.append((first, last))
+
+        self._starts = [first for first, _ in merged]
+        self._ends = [last for _, last in merged]
+
+    def overlapping(self, first: date, last: date) -> Iterable[DateInterval]:
+        """Get intervals which overlap with [first, last]."""
+
+        position = bisect_left(self._ends, first)
+        while position < len(self._starts) and self._starts[position] <= last:
+            yield self._starts[position], self._ends[position]
+            position += 1
+
+
+class Availability:
+    """Available dates as month bitmasks, computed once per month.
+
+    Bit `day - 1` of month mask is set if the day is available.
+    """
+
+    def __init__(
+        self,
+        disabled: DisabledDates = (),
+        disabled_weekdays: Iterable[int] = (),
+        base: Optional["Availability"] = None,
+    ) -> None:
+        """
+        :param disabled - Disabled dates or (first, last) intervals, e.g. holidays
+        :param disabled_weekdays - Disabled weekdays, Monday is 0 and Sunday is 6
+        :param base - Availability shared with other resources, e.g. common holidays
+        """
+        self.disabled = DateIntervals(disabled)
+        self.disabled_weekdays = frozenset(disabled_weekdays)
+        self.base = base
+        self._month_masks: Dict[Tuple[int, int], int] = {}
+
+    def disable(self, disabled: DisabledDates) -> None:
+        """Disable more dates, e.g. fully booked days."""
+
+        self.disabled.update(disabled)
+        self._month_masks.clear()
+
+    def month_mask(self, year: int, month: int) -> int:
+        mask = self._month_masks.get((year, month))
+        if mask is None:
+            mask = self._build_month_mask(year, month)
+            self._month_masks[(year, month)] = mask
+
+        if self.base is not None:
+            mask &= self.base.month_mask(year, month)
+
+        return mask
+
+    def is_available(self, day: date) -> bool:
+        return bool(self.month_mask(day.year, day.month) >> (day.day - 1) & 1)
+
+    def has_available_days(self, year: int, month: int) -> bool:
+        return self.month_mask(year, month) != 0
+
+    def is_range_available(self, first: date, last: date) -> bool:
+        """Check that all days of [first, last] are available."""
+
+        if first > last:
+            return True
+
+        month_start = first.replace(day=1)
+        while True:  # noqa: WPS457
+            days_count = monthrange(month_start.year, month_start.month)[1]
+            month_end = month_start.replace(day=days_count)
+
+            first_index = max(first, month_start).day - 1
+            last_index = min(last, month_end).day - 1
+            range_bits = ((1 << (last_index - first_index + 1)) - 1) << first_index
+            if self.month_mask(month_start.year, month_start.month) & range_bits != (
+                range_bits
+            ):
+                return False
+
+            # month after the last one can be past `date.max`
+            if month_end >= last:
+                return True
+
+            month_start = month_end + timedelta(days=1)
+
+    def _build_month_mask(self, year: int, month: int) -> int:
+        first_weekday, days_count = monthrange(year, month)
+
+        mask = 0
+        for day_index in range(days_count):
+            if (first_weekday + day_index) % 7 not in self.disabled_weekdays:
+                mask |= 1 << day_index
+
+        month_start = date(year, month, 1)
+        month_end = date(year, month, days_count)
+        for first, last in self.disabled.overlapping(month_start, month_end):
+            first_index = max(first, month_start).day - 1
+            last_index = min(last, month_end).day - 1
+            disabled_bits = (1 << (last_index - first_index + 1)) - 1
+            mask &= ~(disabled_bits << first_index)
+
+        return mask
+
+
+class AvailabilityIndex:
+    """Availability of many resources which share common disabled dates."""
+
+    def __init__(self, common: Optional[Availability] = None) -> None:
+        """
+        :param common - Disabled dates and weekdays of all resources
+        """
+        self.common = common or Availability()
+        self._resources: Dict[Hashable, Availability] = {}
+
+    def __getitem__(self, resource_id: Hashable) -> Availability:
+        return self._resources.get(resource_id, self.common)
+
+    def __contains__(self, resource_id: object) -> bool:
+        return resource_id in self._resources
+
+    def set(  # noqa: WPS125
+        self,
+        resource_id: Hashable,
+        disabled: DisabledDates = (),
+        disabled_weekdays: Iterable[int] = (),
+    ) -> Availability:
+        """Set own disabled dates of resource."""
+
+        availability = Availability(disabled, disabled_weekdays, base=self.common)
+        self._resources[resource_id] = availability
+        return availability
+
+
+def _as_intervals(intervals: DisabledDates) -> Iterable[DateInterval]:
+    for interval in intervals:
+        if isinstance(interval, date):
+            yield interval, interval
+        else:
+            yield interval
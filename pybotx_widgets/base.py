@@ -1,9 +1,41 @@
-from typing import Optional
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from uuid import UUID, uuid4
 
-from botx import Bot, Message, MessageMarkup, SendingMessage
+from botx import Bot, BubbleElement, Message, MessageMarkup, SendingMessage
+from botx.models.buttons import Button, ButtonOptions
+
+from pybotx_widgets.ask import AskRegistry, wait_answer
+from pybotx_widgets.content import RegisteredContent
+from pybotx_widgets.locales import DEFAULT_LOCALE, get_locale
+from pybotx_widgets.payload import PAGE_IDS_KEY, PayloadBudget
+from pybotx_widgets.recording import get_recorder
+from pybotx_widgets.resources import strings
+from pybotx_widgets.service import Transport, get_transport, is_widget_message
+from pybotx_widgets.state import StateCodec, decode_message
+from pybotx_widgets.tracing import NOOP_SPAN, Span, get_tracer
+
+ROW_TYPES = (list, tuple, set)
+
+# options are only serialized, so bubbles built at once share default options
+DEFAULT_BUBBLE_OPTIONS = ButtonOptions()
 
 
 class WidgetMarkup:
+    __slots__ = ()
+
     widget_msg: SendingMessage
     additional_markup: Optional[MessageMarkup]
 
@@ -22,46 +54,394 @@ class WidgetMarkup:
             keyboard=(primary.keyboard + additional.keyboard),
         )
 
+    @classmethod
+    def build_bubbles(
+        cls,
+        command: str,
+        data_key: str,
+        values: Sequence[Any],
+        labels: Optional[Sequence[Any]] = None,
+    ) -> List[BubbleElement]:
+        """Build bubbles with `{data_key: value}` data in one pass.
+
+        Bubbles are built without validation, so all of them share command string
+        and default options.
+
+        :param command - Command of all bubbles
+        :param data_key - Key of value in bubble data
+        :param values - Values of bubbles
+        :param labels - Labels of bubbles, values are used by default
+        """
+
+        construct = BubbleElement.construct
+        return [
+            construct(
+                command=command,
+                label=label if isinstance(label, str) else str(label),
+                data={data_key: bubble_value},
+                opts=DEFAULT_BUBBLE_OPTIONS,
+            )
+            for label, bubble_value in zip(values if labels is None else labels, values)
+        ]
+
+    @classmethod
+    def flatten_rows(cls, content: Iterable[Any]) -> Tuple[List[Any], List[int]]:
+        """Get all items of content and sizes of rows.
+
+        Lists, tuples and sets in content are rows of items, other items
+        take a row each.
+        """
+
+        content_items: List[Any] = []
+        rows_sizes: List[int] = []
+        for content_item in content:
+            if isinstance(content_item, ROW_TYPES):
+                content_items.extend(content_item)
+                rows_sizes.append(len(content_item))
+            else:
+                content_items.append(content_item)
+                rows_sizes.append(1)
+
+        return content_items, rows_sizes
+
+    def add_bubble_rows(
+        self, bubbles: List[BubbleElement], rows_sizes: Iterable[int]
+    ) -> None:
+        """Add bubbles split into rows of given sizes."""
+
+        position = 0
+        markup_bubbles = self.widget_msg.markup.bubbles
+        for row_size in rows_sizes:
+            markup_bubbles.append(bubbles[position : position + row_size])
+            position += row_size
+
+
+TWidget = TypeVar("TWidget", bound="Widget")
+
 
 class Widget:
+    __slots__ = (
+        "message",
+        "bot",
+        "command",
+        "additional_markup",
+        "payload_budget",
+        "registered_content",
+        "sent_page_ids",
+        "_text",
+        "_widget_msg",
+    )
+
+    #: Payload budget of widgets created without their own budget
+    default_payload_budget: Optional[PayloadBudget] = None
+    #: Keys of bubbles data which are handled once, e.g. pressed arrow
+    ACTION_KEYS: Tuple[str, ...] = ()
+    #: Keys which values are content items, they are sent as indexes of items
+    CONTENT_REF_KEYS: Tuple[str, ...] = ()
+    #: Codec of state in sent messages, `None` - state is sent as is,
+    #: e.g. `CompactCodec()`, encoded state is received by any widget
+    state_codec: Optional[StateCodec] = None
+    #: Send content items in state as their indexes, they are resolved by
+    #: widget instance, so classmethods like `get_value` need content too
+    content_refs = False
+    #: Code of locale which strings are used by widget class
+    locale = DEFAULT_LOCALE
+
+    def __new__(cls, *args: Any, **kwargs: Any) -> "Widget":
+        recorder = get_recorder()
+        if recorder is not None:
+            recorder.record(cls, args, kwargs)
+
+        return super().__new__(cls)
+
     def __init__(
         self,
         message: Message,
         bot: Bot,
         command: str,
         additional_markup: MessageMarkup = None,
+        payload_budget: PayloadBudget = None,
     ):
         """
         :param message - botx Message
         :param bot - botx Bot
         :param command - Used for bubbles 'command' attribute
         :param additional_markup -  Additional markup for attaching to widget
+        :param payload_budget - Max payload size and action if it's exceeded
         """
         self.message = message
+        with self.trace_span("widget.decode_state"):
+            decode_message(message)
+
         self.bot = bot
         self.command = command
         self.additional_markup = additional_markup
+        self.payload_budget = payload_budget or self.default_payload_budget
+        #: registry entry of content passed by `ContentRef`
+        self.registered_content: Optional[RegisteredContent] = None
+        #: ids of messages of the last display, widget split by payload budget
+        #: takes several messages
+        self.sent_page_ids: List[UUID] = []
+
+        self._text = ""
+        self._widget_msg: Optional[SendingMessage] = None
+
+    @classmethod
+    def for_locale(cls: Type[TWidget], locale: Optional[str]) -> Type[TWidget]:
+        """Get widget class with strings of locale, e.g. of user language.
+
+        :param locale - Code of locale, `None` or unknown code - default locale
+        """
+        return get_locale(locale).localize(cls)
+
+    @property
+    def text(self) -> str:
+        """Text of widget message."""
+
+        if self._widget_msg is not None:
+            return self._widget_msg.text
+
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        self._text = text
+        if self._widget_msg is not None:
+            self._widget_msg.text = text
+
+    @property
+    def widget_msg(self) -> SendingMessage:
+        """Widget message, it's created only when widget is displayed."""
 
-        self.widget_msg = SendingMessage.from_message(message=message)
+        if self._widget_msg is None:
+            self._widget_msg = SendingMessage.from_message(
+                text=self._text, message=self.message
+            )
+
+        return self._widget_msg
+
+    @widget_msg.setter
+    def widget_msg(self, widget_msg: SendingMessage) -> None:
+        self._widget_msg = widget_msg
 
     def add_markup(self) -> None:
         """Add widget markup."""
         raise NotImplementedError
 
-    async def send_widget_message(self) -> None:
-        await self.send_or_update_message(self.widget_msg)
+    def load_state(self) -> None:
+        """Load widget state from message."""
+
+    def restore_state(self) -> None:
+        """Restore state of widget which is displayed again by other widget callback.
+
+        E.g. child of dashboard isn't clicked, but it's rendered again.
+        """
+
+    def rebind(self, message: Message) -> None:
+        """Rebind widget to new callback message and reload its state."""
+
+        self._text = self.text
+        self.message = message
+        self._widget_msg = None
+
+        with self.trace_span("widget.decode_state"):
+            decode_message(message)
+
+        self.resolve_content_refs()
+        self.load_state()
+
+    async def get_answer(self) -> Any:
+        """Get widget answer or `undefined` if interaction isn't finished yet.
+
+        Widgets which don't override it have no answer and can't be asked.
+        """
+
+        raise NotImplementedError
+
+    async def ask(
+        self, timeout: Optional[float] = None, registry: AskRegistry = None
+    ) -> Any:
+        """Display widget and wait for an answer.
+
+        Navigation callbacks are handled by `AskMiddleware` without calling handler.
+
+        :param timeout - Seconds to wait for an answer
+        :param registry - Registry of waiting widgets, default is `ask_registry`
+        """
+
+        if type(self).get_answer is Widget.get_answer:
+            raise NotImplementedError(f"{type(self).__name__} has no answer to wait")
+
+        message_id = await self.display()
+        if message_id is None:
+            raise RuntimeError("Widget message is not sent.")
+
+        # callback can come from bubble of any page of widget
+        return await wait_answer(self, self.sent_page_ids, timeout, registry)
+
+    async def send_widget_message(self) -> Optional[UUID]:
+        return await self.send_or_update_message(self.widget_msg)
+
+    async def display(self) -> Optional[UUID]:
+        with self.trace_span("widget.display") as span:
+            with self.trace_span("widget.render"):
+                self.add_markup()
+
+            with self.trace_span("widget.send_widget_message"):
+                message_id = await self.send_widget_message()
+
+            span.set_tag("sent_message_id", message_id)
+            return message_id
+
+    def trace_span(self, name: str, **tags: Any) -> ContextManager[Span]:
+        """Trace operation of widget, spans of one message are one trace."""
+
+        tracer = get_tracer()
+        if not tracer.enabled:
+            return NOOP_SPAN
+
+        return tracer.span(
+            name,
+            trace_id=str(self.message.sync_id),
+            widget=type(self).__name__,
+            message_id=self.message.source_sync_id,
+            **tags,
+        )
+
+    @property
+    def transport(self) -> Transport:
+        """Transport which sends and updates messages of widget."""
+
+        return get_transport(self.bot)
+
+    def get_state(self) -> Dict[str, Any]:
+        """Get new dict with widget state which is kept in message metadata."""
+
+        return self.message.data
+
+    def get_state_content(self) -> Optional[Sequence[Any]]:
+        """Get content which items are sent as their indexes."""
+
+        return None
 
-    async def display(self) -> None:
-        self.add_markup()
-        await self.send_widget_message()
+    def resolve_content_refs(self) -> None:
+        """Replace received indexes of content items with items."""
 
-    async def send_or_update_message(self, widget_msg: SendingMessage) -> None:
+        content = self.get_state_content()
+        if content is not None:
+            decode_message(self.message, content)
+
+    def encode_state(self, widget_msg: SendingMessage) -> None:
+        """Encode state in metadata and bubbles data of message."""
+
+        if self.state_codec is None:
+            return
+
+        encode: Callable[[Dict[str, Any]], Dict[str, Any]] = self.state_codec.encode
+        if self.content_refs:
+            encode = partial(
+                self.state_codec.encode,
+                content=self.get_state_content(),
+                ref_keys=self.CONTENT_REF_KEYS,
+            )
+
+        widget_msg.metadata = encode(widget_msg.metadata)
+        widget_msg.markup.bubbles = _encode_rows(widget_msg.markup.bubbles, encode)
+        widget_msg.markup.keyboard = _encode_rows(widget_msg.markup.keyboard, encode)
+
+    def check_payload(self, widget_msg: SendingMessage) -> None:
+        """Profile message payload, warn or fail if it exceeds budget."""
+
+        if self.payload_budget is not None:
+            self.payload_budget.check(widget_msg, type(self).__name__)
+
+    async def send_or_update_message(self, widget_msg: SendingMessage) -> UUID:
         """Send new message or update exist."""
 
-        is_pybotx_widget = self.message.metadata.get("pybotx_widget")
+        is_pybotx_widget = is_widget_message(self.message)
+
+        with self.trace_span("widget.send_or_update_message"):
+            widget_msg.metadata = self.get_state()
+            widget_msg.metadata["pybotx_widget"] = 1
+            widget_msg.metadata.pop(PAGE_IDS_KEY, None)
+            with self.trace_span("widget.encode_state"):
+                self.encode_state(widget_msg)
+
+            if self.payload_budget is not None:
+                widget_pages = self.payload_budget.apply(
+                    widget_msg, type(self).__name__
+                )
+                if len(widget_pages) > 1 or PAGE_IDS_KEY in self.message.metadata:
+                    return await self.send_or_update_pages(widget_pages)
+
+            if is_pybotx_widget:
+                widget_msg.credentials.message_id = self.message.source_sync_id
+
+            message_id = await self.transport.send_or_update(
+                widget_msg, update=is_pybotx_widget
+            )
+            self.sent_page_ids = [message_id]
+            return message_id
+
+    async def send_or_update_pages(self, widget_pages: List[SendingMessage]) -> UUID:
+        """Send widget split into several messages or update them.
+
+        Ids of new messages are generated in advance,
+        so every message knows ids of all others.
+        """
+
+        sent_ids = [
+            UUID(page_id) for page_id in self.message.metadata.get(PAGE_IDS_KEY, [])
+        ]
+        if not sent_ids and self.message.metadata.get("pybotx_widget"):
+            sent_ids = [self.message.source_sync_id]  # type: ignore
+
+        page_ids = sent_ids[: len(widget_pages)]
+        page_ids += [uuid4() for _ in range(len(widget_pages) - len(page_ids))]
+        self.sent_page_ids = page_ids[:]
+        metadata = {
+            **widget_pages[0].metadata,
+            PAGE_IDS_KEY: [str(page_id) for page_id in page_ids],
+        }
+
+        for stale_id in sent_ids[len(widget_pages) :]:
+            widget_pages.append(
+                SendingMessage.from_message(
+                    text=strings.EMPTY_MSG_SYMBOL, message=self.message
+                )
+            )
+            page_ids.append(stale_id)
+
+        for widget_page, page_id in zip(widget_pages, page_ids):
+            widget_page.credentials.message_id = page_id
+            widget_page.metadata = metadata
+
+        await self.transport.send_many(
+            [
+                (widget_page, page_id in sent_ids)
+                for widget_page, page_id in zip(widget_pages, page_ids)
+            ]
+        )
+        return page_ids[0]
+
 
-        if is_pybotx_widget:
-            widget_msg.credentials.message_id = self.message.source_sync_id
+def _encode_rows(
+    rows: List[List[Button]], encode: Callable[[Dict[str, Any]], Dict[str, Any]]
+) -> List[List[Button]]:
+    encoded_rows = []
+    for row in rows:
+        encoded_row = []
+        for button in row:
+            encoded_data = encode(button.data)
+            if encoded_data is not button.data:
+                # buttons can be shared with other messages, so they are copied
+                button = button.construct(
+                    command=button.command,
+                    label=button.label,
+                    data=encoded_data,
+                    opts=button.opts,
+                )
+            encoded_row.append(button)
+        encoded_rows.append(encoded_row)
 
-        widget_msg.metadata = {**self.message.data, "pybotx_widget": 1}
-        await self.bot.send(widget_msg, update=is_pybotx_widget)
+    return encoded_rows
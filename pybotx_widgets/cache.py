@@ -0,0 +1,105 @@
+"""Bounded caches with time-based eviction."""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)  # noqa: WPS111
+V = TypeVar("V")  # noqa: WPS111
+
+NEVER_EXPIRES = float("inf")
+
+_missing = object()
+
+
+class TTLCache(Generic[K, V]):
+    """LRU cache with optional time-to-live for every entry."""
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        on_evict: Callable[[K, V], None] = None,
+    ) -> None:
+        """
+        :param max_size - Max count of stored entries, least recently used are evicted
+        :param ttl - Seconds after which entry is evicted, `None` - never expires
+        :param on_evict - Called with key and value of every evicted entry
+        """
+        if max_size < 1:
+            raise ValueError("'max_size' should be greater than 0")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, _missing) is not _missing  # type: ignore
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Get value by key and mark it as recently used."""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._evict(key)
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:  # noqa: WPS125
+        """Store value, evicting expired and least recently used entries."""
+
+        expires_at = (
+            time.monotonic() + self.ttl if self.ttl is not None else NEVER_EXPIRES
+        )
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        self.evict_expired()
+        while len(self._entries) > self.max_size:
+            self._evict(next(iter(self._entries)))
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Remove entry without calling `on_evict`."""
+
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+
+        return entry[1]
+
+    def evict_expired(self) -> None:
+        """Evict expired entries from the least recently used end.
+
+        Entries that expired after being used recently are evicted lazily by `get`.
+        """
+
+        if self.ttl is None:
+            return
+
+        now = time.monotonic()
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at >= now:
+                break
+            self._evict(key)
+
+    def clear(self) -> None:
+        """Evict all entries."""
+
+        for key in list(self._entries):
+            self._evict(key)
+
+    def _evict(self, key: K) -> None:
+        _, value = self._entries.pop(key)
+        if self.on_evict:
+            self.on_evict(key, value)
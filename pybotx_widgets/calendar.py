@@ -1,23 +1,44 @@
 """Calendar widget."""
+
 import re
-from calendar import Calendar
+from calendar import Calendar, monthrange
 from collections.abc import Callable
-from datetime import date
-from typing import Any, Dict, List, Tuple
+from datetime import MAXYEAR, MINYEAR, date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from botx import Bot, BubbleElement, Message
 from dateutil import parser
 from dateutil.relativedelta import relativedelta
 
+from pybotx_widgets.availability import Availability
 from pybotx_widgets.base import Widget, WidgetMarkup
 from pybotx_widgets.resources import strings
 from pybotx_widgets.service import send_or_update_message
+from pybotx_widgets.state import decode_message
+from pybotx_widgets.undefined import undefined
 
 MONTH_TO_DISPLAY_KEY = "calendar_month_to_display"
 SELECTED_DATE_KEY = "calendar_selected_date"
+SCREEN_KEY = "calendar_screen"
+RANGE_START_KEY = "calendar_range_start"
+
+DAYS_SCREEN = "days"
+MONTHS_SCREEN = "months"
+YEARS_SCREEN = "years"
+YEARS_PER_ROW = 5
+MONTHS_PER_ROW = 4
+
+# max count of months without available dates which are skipped by month arrows
+MAX_SKIPPED_MONTHS = 120
+ALL_DAYS_MASK = (1 << 31) - 1
+MONTH_GRID_CACHE_SIZE = 256
+STATIC_ROWS_CACHE_SIZE = 16
 
 
 class MarkupMixin(WidgetMarkup):
+    __slots__ = ()
+
     message: Message
     command: str
 
@@ -25,12 +46,18 @@ class MarkupMixin(WidgetMarkup):
     end_date: date
     current_date: date
     include_past: bool
+    availability: Optional[Availability]
+    lower_limit: date
+    range_start: Optional[date]
+    range_end: Optional[date]
 
     LEFT_ARROW: str
     RIGHT_ARROW: str
 
     MONTHS: Dict[int, str]
     WEEKDAYS: Tuple[str]
+    RANGE_EDGE_LABEL: str
+    RANGE_DAY_LABEL: str
 
     get_prev_and_next_year: Callable
     get_prev_and_next_month: Callable
@@ -52,10 +79,8 @@ class MarkupMixin(WidgetMarkup):
                 data={MONTH_TO_DISPLAY_KEY: prev_year},
             )
 
-        self.widget_msg.markup.add_bubble(
-            command="",
-            label=str(self.current_date.year),
-            new_row=False,
+        self.add_screen_bubble(
+            str(self.current_date.year), self.current_date, YEARS_SCREEN
         )
 
         if self.current_date.year == self.end_date.year:
@@ -99,10 +124,8 @@ class MarkupMixin(WidgetMarkup):
                 label=self.LEFT_ARROW,
                 data={MONTH_TO_DISPLAY_KEY: prev_month},
             )
-        self.widget_msg.markup.add_bubble(
-            command="",
-            label=self.MONTHS[self.current_date.month],
-            new_row=False,
+        self.add_screen_bubble(
+            self.MONTHS[self.current_date.month], self.current_date, MONTHS_SCREEN
         )
 
         if is_upper_limit:
@@ -122,7 +145,7 @@ class MarkupMixin(WidgetMarkup):
         """Add week bubbles ([Пн][Вт][Ср][Чт][Пт][Сб][Вс])."""
 
         self.widget_msg.markup.bubbles.append(
-            [BubbleElement(label=weekday, command="") for weekday in self.WEEKDAYS]
+            list(get_weekdays_row(tuple(self.WEEKDAYS)))
         )
 
     def add_day_bubbles(self) -> None:
@@ -133,9 +156,9 @@ class MarkupMixin(WidgetMarkup):
         [25][26][27][28][29][30]
         """
 
-        weeks = Calendar().monthdatescalendar(
-            year=self.current_date.year, month=self.current_date.month
-        )
+        weeks = get_month_weeks(self.current_date.year, self.current_date.month)
+        available_days = self.get_available_days_mask()
+
         for calendar_row, week in enumerate(weeks, 1):
             calendar_dates_row: List[BubbleElement] = []
             append_row = False
@@ -149,11 +172,12 @@ class MarkupMixin(WidgetMarkup):
                         calendar_date > self.end_date,
                         calendar_row == len(weeks) and calendar_date.day < 7,
                         calendar_row == 1 and calendar_date.day > 7,
+                        not available_days >> (calendar_date.day - 1) & 1,
                     )
                 )
 
                 if show_day:
-                    label = str(calendar_date.day)
+                    label = self.get_day_label(calendar_date)
                     bubble_data = {SELECTED_DATE_KEY: calendar_date}
                     bubble_command = f"{self.command} {calendar_date}"
 
@@ -174,12 +198,147 @@ class MarkupMixin(WidgetMarkup):
             if append_row:
                 self.widget_msg.markup.bubbles.append(calendar_dates_row)
 
+    def get_day_label(self, calendar_date: date) -> str:
+        """Get day label, days of selected range are highlighted."""
+
+        day_label = str(calendar_date.day)
+        if self.range_start is None:
+            return day_label
+
+        range_end = self.range_end or self.range_start
+        if calendar_date in {self.range_start, range_end}:
+            return self.RANGE_EDGE_LABEL.format(day=day_label)
+        elif self.range_start < calendar_date < range_end:
+            return self.RANGE_DAY_LABEL.format(day=day_label)
+
+        return day_label
+
+    def add_years_picker(self) -> None:
+        """Add decade of years ([<] [2020-2029] [>] and grid of years)."""
+
+        decade_start = self.current_date.year // 10 * 10
+        decade_end = min(decade_start + 9, MAXYEAR)
+        # there is no year 0, so the first decade is 1-9
+        decade_label = f"{max(decade_start, MINYEAR)}-{decade_end}"
+
+        if decade_start <= self.lower_limit.year:
+            self.widget_msg.markup.add_bubble(command=self.command, label=" ")
+        else:
+            self.add_screen_bubble(
+                self.LEFT_ARROW,
+                date(max(decade_start - 10, MINYEAR), 1, 1),
+                YEARS_SCREEN,
+                new_row=True,
+            )
+
+        self.widget_msg.markup.add_bubble(command="", label=decade_label, new_row=False)
+
+        if decade_end >= self.end_date.year:
+            self.widget_msg.markup.add_bubble(
+                command=self.command, label=" ", new_row=False
+            )
+        else:
+            self.add_screen_bubble(
+                self.RIGHT_ARROW, date(decade_end + 1, 1, 1), YEARS_SCREEN
+            )
+
+        for row_start in range(decade_start, decade_end + 1, YEARS_PER_ROW):
+            row_years = range(row_start, min(row_start + YEARS_PER_ROW, decade_end + 1))
+            if not any(self.is_year_available(year) for year in row_years):
+                continue
+
+            for year in row_years:
+                new_row = year == row_start
+                if self.is_year_available(year):
+                    self.add_screen_bubble(
+                        str(year),
+                        date(year, self.current_date.month, 1),
+                        MONTHS_SCREEN,
+                        new_row=new_row,
+                    )
+                else:
+                    self.widget_msg.markup.add_bubble(
+                        command="", label="", new_row=new_row
+                    )
+
+    def is_year_available(self, year: int) -> bool:
+        """Check that year is between limits of calendar."""
+
+        return max(self.lower_limit.year, MINYEAR) <= year <= self.end_date.year
+
+    def add_months_picker(self) -> None:
+        """Add months of year ([year] and grid of months)."""
+
+        year = self.current_date.year
+        self.add_screen_bubble(str(year), self.current_date, YEARS_SCREEN, new_row=True)
+
+        for month, month_label in sorted(self.MONTHS.items()):
+            new_row = (month - 1) % MONTHS_PER_ROW == 0
+            month_start = date(year, month, 1)
+            month_end = month_start.replace(day=monthrange(year, month)[1])
+
+            is_available = all(
+                (
+                    month_end >= self.lower_limit,
+                    month_start <= self.end_date,
+                    self.availability is None
+                    or self.availability.has_available_days(year, month),
+                )
+            )
+            if is_available:
+                self.add_screen_bubble(
+                    month_label, month_start, DAYS_SCREEN, new_row=new_row
+                )
+            else:
+                self.widget_msg.markup.add_bubble(command="", label="", new_row=new_row)
+
+    def add_screen_bubble(
+        self, label: str, month_to_display: date, screen: str, new_row: bool = False
+    ) -> None:
+        """Add bubble which opens screen of calendar with given month."""
+
+        self.widget_msg.markup.add_bubble(
+            command=self.command,
+            label=label,
+            data={MONTH_TO_DISPLAY_KEY: month_to_display, SCREEN_KEY: screen},
+            new_row=new_row,
+        )
+
+    def get_available_days_mask(self) -> int:
+        """Get bitmask of available days of displayed month."""
+
+        if self.availability is None:
+            return ALL_DAYS_MASK
+
+        return self.availability.month_mask(
+            self.current_date.year, self.current_date.month
+        )
+
 
 class CalendarWidget(Widget, MarkupMixin):
+    __slots__ = (
+        "start_date",
+        "end_date",
+        "include_past",
+        "availability",
+        "range_mode",
+        "month_to_display",
+        "selected_date",
+        "screen",
+        "range_start",
+        "range_end",
+        "current_date",
+    )
+
+    ACTION_KEYS = (SELECTED_DATE_KEY, SCREEN_KEY)
     LEFT_ARROW = strings.LEFT_ARROW
     RIGHT_ARROW = strings.RIGHT_ARROW
     AFTER_SELECT_TEXT = strings.CAL_DATE_SELECTED
     SELECT_DATE = strings.SELECT_DATE
+    SELECT_RANGE_END = strings.SELECT_RANGE_END
+    RANGE_HAS_UNAVAILABLE_DAYS = strings.CAL_RANGE_HAS_UNAVAILABLE_DAYS
+    RANGE_EDGE_LABEL = strings.CAL_RANGE_EDGE_LABEL
+    RANGE_DAY_LABEL = strings.CAL_RANGE_DAY_LABEL
     WEEKDAYS = strings.WEEKDAYS  # type: ignore
     MONTHS = strings.MONTHS
 
@@ -189,38 +348,113 @@ class CalendarWidget(Widget, MarkupMixin):
         end_date: date = date.max,
         include_past: bool = False,
         *args: Any,
+        availability: Availability = None,
+        range_mode: bool = False,
         **kwargs: Any,
     ):
         """
         :param start_date - Calendar start date, previews dates hides
         :param end_date - Calendar end date, next dates hides
         :param include_past - Include past dates from start_date
+        :param availability - Available dates, month arrows skip months without them
+        :param range_mode - Select range of dates, `get_value` returns both ends
         """
         super().__init__(*args, **kwargs)
 
         self.start_date = start_date or date.today()
         self.end_date = end_date
         self.include_past = include_past
+        self.availability = availability
+        self.range_mode = range_mode
+
+        self.text = self.SELECT_DATE
+        self.load_state()
+
+    def load_state(self) -> None:
+        """Load displayed month, screen and selected date from message."""
 
         self.month_to_display = self.message.data.get(MONTH_TO_DISPLAY_KEY)
         self.selected_date = self.message.data.get(SELECTED_DATE_KEY)
-        self.widget_msg.text = self.SELECT_DATE
+        # screen is opened only by bubble, so it isn't taken from metadata
+        self.screen = self.message.command.data.get(SCREEN_KEY, DAYS_SCREEN)
+
+        self.range_start = self.range_end = None
+        if self.range_mode:
+            self.load_range()
+
         self.current_date = self.get_current_date()
 
+    def restore_state(self) -> None:
+        """Display stored month instead of current one."""
+
+        if self.month_to_display:
+            self.current_date = _parse_date(self.month_to_display)
+
+    def load_range(self) -> None:
+        """Load ends of range, first selected date is kept as range start."""
+
+        range_start = self.message.metadata.get(RANGE_START_KEY)
+        if range_start is None and self.selected_date:
+            range_start = self.message.command.data.pop(SELECTED_DATE_KEY)
+            self.message.metadata[RANGE_START_KEY] = range_start
+            self.selected_date = None
+
+        if range_start is None:
+            return
+
+        self.text = self.SELECT_RANGE_END
+        self.range_start = _parse_date(range_start)
+
+        if not self.selected_date:
+            return
+
+        range_start, range_end = sorted(
+            (self.range_start, _parse_date(self.selected_date))
+        )
+        if self.availability is not None and not self.availability.is_range_available(
+            range_start, range_end
+        ):
+            # range with unavailable days isn't selected, end is asked again
+            self.message.command.data.pop(SELECTED_DATE_KEY)
+            self.selected_date = None
+            self.text = self.RANGE_HAS_UNAVAILABLE_DAYS
+            return
+
+        self.range_start, self.range_end = range_start, range_end
+
+    @property
+    def lower_limit(self) -> date:  # type: ignore
+        """Min date which can be displayed."""
+
+        return date.min if self.include_past else self.start_date
+
     def get_current_date(self) -> date:
         arg = self.message.command.single_argument
         arrows_regexp = f"{self.LEFT_ARROW}|{self.RIGHT_ARROW}"
+        is_navigation = (
+            re.findall(arrows_regexp, arg) or SCREEN_KEY in self.message.command.data
+        )
 
-        if re.findall(arrows_regexp, arg) and self.month_to_display:
+        if is_navigation and self.month_to_display:
             return parser.parse(self.month_to_display).date()
+        elif self.range_start:
+            return self.range_start
         else:
             return date.today()
 
     @classmethod
-    async def get_value(cls, message: Message, bot: Bot) -> date:
+    async def get_value(
+        cls, message: Message, bot: Bot
+    ) -> Union[date, Tuple[date, date]]:
+        """Get selected date or (start, end) in range mode."""
+
+        decode_message(message)
         selected_date = message.data[SELECTED_DATE_KEY]
+        range_start = message.data.get(RANGE_START_KEY)
         try:
             selected_date = parser.parse(selected_date).date()
+            if range_start:
+                range_start = parser.parse(range_start).date()
         except parser.ParserError:  # type: ignore
             raise RuntimeError("Date is not selected.")
 
@@ -228,8 +462,17 @@ class CalendarWidget(Widget, MarkupMixin):
         # Remove buttons
         await send_or_update_message(message, bot, cls.AFTER_SELECT_TEXT)
 
+        if range_start:
+            return min(range_start, selected_date), max(range_start, selected_date)
+
         return selected_date
 
+    async def get_answer(self) -> Any:
+        if not self.selected_date:
+            return undefined
+
+        return await self.get_value(self.message, self.bot)
+
     def get_prev_and_next_year(self) -> Tuple[date, date]:
         month = 1 if self.include_past else date.today().month
         prev_year = (self.current_date - relativedelta(years=1)).replace(
@@ -241,21 +484,76 @@ class CalendarWidget(Widget, MarkupMixin):
         return prev_year, next_year
 
     def get_prev_and_next_month(self) -> Tuple[date, date]:
-        prev_month = self.current_date - relativedelta(months=1)
-        next_month = self.current_date + relativedelta(months=1)
+        prev_month = self.get_available_month(-1)
+        next_month = self.get_available_month(1)
         return prev_month, next_month
 
+    def get_available_month(self, step: int) -> date:
+        """Get nearest month with available dates in direction of step.
+
+        If there is no such month, then adjacent month is returned.
+        """
+
+        adjacent_month = self.current_date + relativedelta(months=step)
+        if self.availability is None:
+            return adjacent_month
+
+        month = adjacent_month
+        for _ in range(MAX_SKIPPED_MONTHS):
+            month_start = month.replace(day=1)
+            month_end = month.replace(day=monthrange(month.year, month.month)[1])
+            if month_end < self.lower_limit or month_start > self.end_date:
+                break
+
+            if self.availability.has_available_days(month.year, month.month):
+                return month
+
+            month += relativedelta(months=step)
+
+        return adjacent_month
+
     def add_markup(self) -> None:
-        self.add_year_bubbles()
-        self.add_month_bubbles()
-        self.add_week_bubbles()
-        self.add_day_bubbles()
+        if self.screen == YEARS_SCREEN:
+            self.add_years_picker()
+        elif self.screen == MONTHS_SCREEN:
+            self.add_months_picker()
+        else:
+            self.add_year_bubbles()
+            self.add_month_bubbles()
+            self.add_week_bubbles()
+            self.add_day_bubbles()
 
         self.add_additional_markup()
 
 
+@lru_cache(maxsize=MONTH_GRID_CACHE_SIZE)
+def get_month_weeks(year: int, month: int) -> Tuple[Tuple[date, ...], ...]:
+    """Get cached weeks of month grid."""
+
+    return tuple(
+        tuple(week) for week in Calendar().monthdatescalendar(year=year, month=month)
+    )
+
+
+@lru_cache(maxsize=STATIC_ROWS_CACHE_SIZE)
+def get_weekdays_row(weekdays: Tuple[str, ...]) -> Tuple[BubbleElement, ...]:
+    """Get cached bubbles of weekdays header."""
+
+    return tuple(BubbleElement(label=weekday, command="") for weekday in weekdays)
+
+
+def _parse_date(raw_date: Union[str, date]) -> date:
+    if isinstance(raw_date, date):
+        return raw_date
+
+    return parser.parse(raw_date).date()
+
+
 def _clear_calendar_data(message: Message) -> None:
     """Clear widget data form message.data."""
 
     message.command.data.pop(MONTH_TO_DISPLAY_KEY, None)
     message.command.data.pop(SELECTED_DATE_KEY, None)
+    message.command.data.pop(SCREEN_KEY, None)
+    message.command.data.pop(RANGE_START_KEY, None)
+    message.metadata.pop(RANGE_START_KEY, None)
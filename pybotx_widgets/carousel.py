@@ -1,13 +1,26 @@
 """Carousel widget."""
 
-from itertools import cycle, islice
-from typing import Any, Iterator, Optional, Sequence, Tuple
+from typing import Any, Hashable, Iterator, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
 
 from botx import Bot, BubbleElement, Message
 
-from pybotx_widgets.base import Widget, WidgetMarkup
+from pybotx_widgets.base import ROW_TYPES, Widget, WidgetMarkup
+from pybotx_widgets.cache import TTLCache
+from pybotx_widgets.content import ContentRef, resolve_content
 from pybotx_widgets.resources import strings
+from pybotx_widgets.search import ContentIndex, get_content_index
 from pybotx_widgets.service import send_or_update_message
+from pybotx_widgets.sources import (
+    ContentSource,
+    ContentWindow,
+    Window,
+    load_window,
+    prefetch_neighbors,
+    window_ranges,
+)
+from pybotx_widgets.state import decode_message
+from pybotx_widgets.undefined import undefined
 
 LEFT_PRESSED = "CAROUSEL_LEFT_BUTTON_PRESSED"
 RIGHT_PRESSED = "CAROUSEL_RIGHT_BUTTON_PRESSED"
@@ -16,9 +29,19 @@ START_FROM_KEY = "carousel_start_from"
 SELECTED_VALUE_KEY = "carousel_selected_val"
 SELECTED_VALUE_LABEL_KEY = "carousel_selected_value_label"
 MESSAGE_LABEL_KEY = "carousel_message_label"
+SEARCH_QUERY_KEY = "carousel_search_query"
+
+ROWS_CACHE_SIZE = 4096
+
+#: bubbles of content rows by command and row items
+rows_cache: TTLCache[Hashable, Tuple[BubbleElement, ...]] = TTLCache(
+    max_size=ROWS_CACHE_SIZE
+)
 
 
 class ValidationMixin:
+    __slots__ = ()
+
     LEFT_ARROW: str
     RIGHT_ARROW: str
     SELECTED_VALUE_LABEL: str
@@ -28,14 +51,14 @@ class ValidationMixin:
     loop: bool
     inline: bool
     show_numbers: bool
-    _control_labels: Tuple[str, str]
+    max_row_width: Optional[int]
+    control_labels: Tuple[str, str]
 
     def _validate_params(self) -> None:
         if "{selected_val}" not in self.SELECTED_VALUE_LABEL:
             raise ValueError("'SELECTED_VALUE_LABEL' should contains '{selected_val}'")
 
-        if self._start_from > len(self.widget_content):
-            raise ValueError("'start_from' is greater than 'widget_content'")
+        self._validate_content()
 
         if self.loop and self.show_numbers:
             raise ValueError("Sorry, you can't enable both 'loop' and 'show_numbers'")
@@ -43,15 +66,24 @@ class ValidationMixin:
         if self.inline and self.show_numbers:
             raise ValueError("Sorry, you can't enable both 'inline' and 'show_numbers'")
 
+        if self.max_row_width is not None and self.max_row_width < 1:
+            raise ValueError("'max_row_width' should be greater than 0")
+
         if self.show_numbers:
-            if self._control_labels[0].count("{}") != 2:
+            if self.control_labels[0].count("{}") != 2:
                 raise ValueError("Left control label should have exactly two '{}'")
 
-            if self._control_labels[1].count("{}") != 2:
+            if self.control_labels[1].count("{}") != 2:
                 raise ValueError("Right control label should have exactly two '{}'")
 
+    def _validate_content(self) -> None:
+        if self._start_from > len(self.widget_content):
+            raise ValueError("'start_from' is greater than 'widget_content'")
+
 
 class MarkupMixin(WidgetMarkup):
+    __slots__ = ()
+
     displayed_content: Iterator
 
     widget_content: Sequence
@@ -59,6 +91,7 @@ class MarkupMixin(WidgetMarkup):
     start_from: int
     end: int
     loop: bool
+    max_row_width: Optional[int]
 
     message: Message
     command: str
@@ -89,13 +122,13 @@ class MarkupMixin(WidgetMarkup):
                 new_row=False,
             )
 
-        for content_item in self.displayed_content:
-            self.widget_msg.markup.add_bubble(
-                command=self.command,
-                label=content_item,
-                data={SELECTED_VALUE_KEY: content_item},
-                new_row=False,
-            )
+        content_bubbles = self.build_bubbles(
+            self.command, SELECTED_VALUE_KEY, list(self.displayed_content)
+        )
+        if self.widget_msg.markup.bubbles:
+            self.widget_msg.markup.bubbles[-1].extend(content_bubbles)
+        elif content_bubbles:
+            self.widget_msg.markup.bubbles.append(content_bubbles)
 
         if show_right_arrow:
             self.widget_msg.markup.add_bubble(
@@ -105,6 +138,43 @@ class MarkupMixin(WidgetMarkup):
                 new_row=False,
             )
 
+    def iter_rows(self) -> Iterator[Tuple[Any, ...]]:
+        """Get rows of displayed content one by one.
+
+        Items of sets are sorted, so same content is always rendered the same way,
+        rows wider than `max_row_width` are split into several rows.
+        """
+
+        for content_item in self.displayed_content:
+            if not isinstance(content_item, ROW_TYPES):
+                yield (content_item,)
+                continue
+
+            row = _normalize_row(content_item)
+            row_width = self.max_row_width or len(row) or 1
+            for row_start in range(0, len(row), row_width):
+                yield row[row_start : row_start + row_width]
+
+    def build_row(self, row: Tuple[Any, ...]) -> List[BubbleElement]:
+        """Build bubbles of row or take them from cache."""
+
+        # types are a part of key, because `1 == 1.0`, but their labels differ
+        row_key = (self.command, row, tuple(map(type, row)))
+        try:
+            row_bubbles = rows_cache.get(row_key)
+        except TypeError:
+            # row with unhashable items isn't cached
+            return self.build_bubbles(self.command, SELECTED_VALUE_KEY, row)
+
+        if row_bubbles is None:
+            row_bubbles = tuple(
+                self.build_bubbles(self.command, SELECTED_VALUE_KEY, row)
+            )
+            rows_cache.set(row_key, row_bubbles)
+
+        # rows of markup are extended by arrows, so cached row is copied
+        return list(row_bubbles)
+
     def add_newline_markup(self) -> None:
         """Build newline markup for Carousel widget."""
 
@@ -115,29 +185,21 @@ class MarkupMixin(WidgetMarkup):
             "data": {SELECTED_VALUE_KEY: RIGHT_PRESSED},
         }
 
-        for content_item in self.displayed_content:
-            if isinstance(content_item, (list, tuple, set)):
-                self.widget_msg.markup.bubbles.append(
-                    [
-                        BubbleElement(
-                            command=self.command,
-                            label=row_item,
-                            data={SELECTED_VALUE_KEY: row_item},
-                        )
-                        for row_item in content_item
-                    ]
-                )
-                continue
-
-            self.widget_msg.markup.bubbles.append(
-                [
-                    BubbleElement(
-                        command=self.command,
-                        label=content_item,
-                        data={SELECTED_VALUE_KEY: content_item},
-                    )
-                ]
+        rows = list(self.iter_rows())
+        # single items are built at once, rows of items are taken from cache
+        single_bubbles = iter(
+            self.build_bubbles(
+                self.command,
+                SELECTED_VALUE_KEY,
+                [row[0] for row in rows if len(row) == 1],
             )
+        )
+        markup_bubbles = self.widget_msg.markup.bubbles
+        for row in rows:
+            if len(row) == 1:
+                markup_bubbles.append([next(single_bubbles)])
+            else:
+                markup_bubbles.append(self.build_row(row))
 
         if show_left_arrow:
             self.widget_msg.markup.add_bubble(
@@ -153,6 +215,22 @@ class MarkupMixin(WidgetMarkup):
 
 
 class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
+    __slots__ = (
+        "widget_content",
+        "displayed_content_count",
+        "inline",
+        "loop",
+        "show_numbers",
+        "max_row_width",
+        "initial_start_from",
+        "content_len",
+        "selected_val",
+        "_start_from",
+        "_control_labels",
+    )
+
+    ACTION_KEYS = (SELECTED_VALUE_KEY,)
+    CONTENT_REF_KEYS = (SELECTED_VALUE_KEY,)
     LEFT_ARROW = strings.LEFT_ARROW
     RIGHT_ARROW = strings.RIGHT_ARROW
     LEFT_LABEL_WITH_NUMBERS = f"{LEFT_ARROW} ({{}}-{{}})"
@@ -163,7 +241,7 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
 
     def __init__(
         self,
-        widget_content: Sequence,
+        widget_content: Union[Sequence, ContentRef],
         label: str,
         start_from: int = 0,
         displayed_content_count: int = 3,
@@ -172,10 +250,12 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
         loop: bool = True,
         show_numbers: bool = False,
         *args: Any,
+        max_row_width: Optional[int] = None,
         **kwargs: Any,
     ) -> None:
         """
-        :param widget_content - All content to be displayed
+        :param widget_content - All content to be displayed or reference
+        to registered content
         :param label - Text of message
         :param start_from - Start display content from
         :param displayed_content_count - Count of content to be displayed
@@ -184,43 +264,60 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
         :param loop - Loop content or not
         :param show_numbers - Show content order numbers
         for prev/next control bubbles' labels.
+        :param max_row_width - Max count of bubbles in row of newline mode,
+        wider rows of content are split
         """
         super().__init__(*args, **kwargs)
 
-        self.widget_content = widget_content
-        self.widget_msg.text = label
+        self.widget_content, self.registered_content = resolve_content(widget_content)
+        self.text = label
         self._start_from = start_from
         self.displayed_content_count = displayed_content_count
         self.inline = inline
         self.loop = loop
         self.show_numbers = show_numbers
+        self.max_row_width = max_row_width
 
-        if not control_labels:
-            if self.show_numbers:
-                self._control_labels = (
-                    self.LEFT_LABEL_WITH_NUMBERS,
-                    self.RIGHT_LABEL_WITH_NUMBERS,
-                )
-            else:
-                self._control_labels = (self.LEFT_ARROW, self.RIGHT_ARROW)
+        # default labels are taken from class, so they aren't kept by every widget
+        self._control_labels = control_labels
 
         self._validate_params()
 
-        self.selected_val = self.message.data.get(SELECTED_VALUE_KEY, "")
-        self._start_from = self.message.data.get(START_FROM_KEY, start_from)
+        self.initial_start_from = start_from
         self.content_len = len(self.widget_content)
+        self.resolve_content_refs()
+        self.load_state()
+
+    def load_state(self) -> None:
+        """Load current position and selected value from message."""
+
+        self.selected_val = self.message.data.get(SELECTED_VALUE_KEY, "")
+        self._start_from = self.message.data.get(
+            START_FROM_KEY, self.initial_start_from
+        )
 
         if self.selected_val == LEFT_PRESSED:
-            self._start_from -= displayed_content_count
+            self._start_from -= self.displayed_content_count
         elif self.selected_val == RIGHT_PRESSED:
-            self._start_from += displayed_content_count
+            self._start_from += self.displayed_content_count
 
         self.set_widget_data()
 
+    @property
+    def control_labels(self) -> Tuple[str, str]:  # type: ignore
+        """Labels of prev/next control bubbles."""
+
+        if self._control_labels:
+            return self._control_labels
+        elif self.show_numbers:
+            return self.LEFT_LABEL_WITH_NUMBERS, self.RIGHT_LABEL_WITH_NUMBERS
+
+        return self.LEFT_ARROW, self.RIGHT_ARROW
+
     @property
     def left_btn_label(self) -> str:  # type: ignore
         """Left button label."""
-        left_label = self._control_labels[0]
+        left_label = self.control_labels[0]
 
         if self.show_numbers:
             left_bound = self.start_from - self.displayed_content_count + 1
@@ -231,7 +328,7 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
     @property
     def right_btn_label(self) -> str:  # type: ignore
         """Right button label."""
-        right_label = self._control_labels[1]
+        right_label = self.control_labels[1]
 
         if self.show_numbers:
             right_bound = self.end + self.displayed_content_count
@@ -266,14 +363,35 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
 
     @property
     def displayed_content(self) -> Iterator:  # type: ignore
+        if not self.content_len:
+            return iter(())
+
         if self.loop:
             # Loop content
-            return islice(cycle(self.widget_content), self.start_from, self.end)
+            return (
+                self.widget_content[position % self.content_len]
+                for position in range(self.start_from, self.end)
+            )
 
-        return islice(self.widget_content, self.start_from, self.end)
+        return (
+            self.widget_content[position]
+            for position in range(self.start_from, min(self.end, self.content_len))
+        )
 
     @classmethod
-    async def get_value(cls, message: Message, bot: Bot) -> Optional[str]:
+    async def get_value(
+        cls,
+        message: Message,
+        bot: Bot,
+        content: Optional[Union[Sequence, ContentRef]] = None,
+    ) -> Optional[str]:
+        """Get selected value.
+
+        :param content - Content of carousel if `content_refs` is enabled
+        """
+        if content is not None:
+            content = resolve_content(content)[0]
+        decode_message(message, content)
         selected_val = message.data[SELECTED_VALUE_KEY]
         label = message.data[MESSAGE_LABEL_KEY]
 
@@ -288,6 +406,15 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
 
         return selected_val
 
+    async def get_answer(self) -> Any:
+        if not self.is_value_selected:
+            return undefined
+
+        return await self.get_value(self.message, self.bot)
+
+    def get_state_content(self) -> Optional[Sequence]:
+        return self.widget_content
+
     def set_widget_data(self) -> None:
         """Set widget related data into message.data."""
 
@@ -296,7 +423,7 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
 
         # Set selected_value_label and carousel_message_label for get_carousel_result
         self.message.command.data[SELECTED_VALUE_LABEL_KEY] = self.SELECTED_VALUE_LABEL
-        self.message.command.data[MESSAGE_LABEL_KEY] = self.widget_msg.text
+        self.message.command.data[MESSAGE_LABEL_KEY] = self.text
 
     def add_markup(self) -> None:
         if self.inline:
@@ -307,6 +434,121 @@ class CarouselWidget(Widget, ValidationMixin, MarkupMixin):
         self.add_additional_markup()
 
 
+class SearchableCarouselWidget(CarouselWidget):
+    """Carousel which displays only content matched by search query."""
+
+    __slots__ = ("query", "content_index")
+
+    def __init__(
+        self,
+        widget_content: Union[Sequence, ContentRef],
+        label: str,
+        query: Optional[str] = None,
+        content_version: Optional[Hashable] = None,
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        """
+        :param widget_content - All content to be searched
+        :param label - Text of message
+        :param query - New search query, e.g. text typed by user,
+        `None` - keep query from previous message
+        :param content_version - Version of content for index caching,
+        `None` - hash of content is used, index of registered content is kept
+        with its version
+        """
+        self.query = query
+
+        content, registered_content = resolve_content(widget_content)
+        if registered_content is not None:
+            self.content_index = registered_content.get_artifact(
+                ContentIndex, ContentIndex
+            )
+        else:
+            self.content_index = get_content_index(content, content_version)
+
+        super().__init__(widget_content, label, *args, **kwargs)
+
+    def get_state_content(self) -> Optional[Sequence]:
+        return self.content_index.content
+
+    def load_state(self) -> None:
+        """Filter content by search query and load position in filtered content."""
+
+        stored_query = self.message.data.get(SEARCH_QUERY_KEY, "")
+        query = stored_query if self.query is None else self.query
+
+        if query != stored_query:
+            # new search results are displayed from the beginning
+            self.message.command.data[START_FROM_KEY] = self.initial_start_from
+            self.message.command.data.pop(SELECTED_VALUE_KEY, None)
+
+        self.message.command.data[SEARCH_QUERY_KEY] = query
+        self.widget_content = self.content_index.filter(query)
+        self.content_len = len(self.widget_content)
+
+        super().load_state()
+
+
+class AsyncCarouselWidget(CarouselWidget):
+    """Carousel which loads only displayed content from asynchronous source."""
+
+    __slots__ = ("content_source", "content_loaded")
+
+    widget_content: ContentWindow
+
+    def __init__(
+        self, content_source: ContentSource, label: str, *args: Any, **kwargs: Any
+    ) -> None:
+        """
+        :param content_source - Source of content to be displayed,
+        use shared `PrefetchingSource` to load neighboring content in advance
+        :param label - Text of message
+        """
+        self.content_source = content_source
+        self.content_loaded = False
+
+        super().__init__(ContentWindow(), label, *args, **kwargs)
+
+    def _validate_content(self) -> None:
+        if self.content_loaded:
+            super()._validate_content()
+
+    def get_state_content(self) -> Optional[Sequence]:
+        # only window of content is loaded, so items are sent as is
+        return None
+
+    async def load_content(self) -> None:
+        """Load displayed content and start prefetching of neighboring content."""
+
+        self.content_len = await self.content_source.count()
+        self.widget_content.reset(self.content_len)
+        self.content_loaded = True
+        self._validate_content()
+
+        await load_window(
+            self.content_source, self.widget_content, self._window_ranges(0)
+        )
+        prefetch_neighbors(
+            self.content_source,
+            self._window_ranges(-self.displayed_content_count)
+            + self._window_ranges(self.displayed_content_count),
+            owner=(self.message.group_chat_id, self.message.user_huid),
+        )
+
+    async def display(self) -> Optional[UUID]:
+        await self.load_content()
+        return await super().display()
+
+    def _window_ranges(self, shift: int) -> List[Window]:
+        return window_ranges(
+            self.start_from + shift,
+            self.displayed_content_count,
+            self.content_len,
+            loop=self.loop,
+        )
+
+
 def _clear_carousel_data(message: Message) -> None:
     """Clear widget data from message.data."""
 
@@ -314,3 +556,16 @@ def _clear_carousel_data(message: Message) -> None:
     message.command.data.pop(SELECTED_VALUE_LABEL_KEY, None)
     message.command.data.pop(MESSAGE_LABEL_KEY, None)
     message.command.data.pop(START_FROM_KEY, None)
+    message.command.data.pop(SEARCH_QUERY_KEY, None)
+
+
+def _normalize_row(row: Any) -> Tuple[Any, ...]:
+    if isinstance(row, set):
+        # order of set items differs between processes
+        return tuple(sorted(row, key=_row_item_order))
+
+    return tuple(row)
+
+
+def _row_item_order(row_item: Any) -> Tuple[str, str]:
+    return type(row_item).__name__, str(row_item)
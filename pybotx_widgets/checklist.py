@@ -1,16 +1,21 @@
 """Checklist widget."""
-from typing import Any, List, Sequence, Union
 
-from botx import BubbleElement, Message
+from typing import Any, Collection, List, Optional, Sequence, Union
+
+from botx import Message
 
 from pybotx_widgets.base import Widget, WidgetMarkup
+from pybotx_widgets.content import ContentRef, resolve_content
 from pybotx_widgets.resources import strings
+from pybotx_widgets.state import decode_message
 
 SELECTED_ITEM_KEY = "checklist_selected_item"
 CHECKED_ITEMS_KEY = "checklist_checked_items"
 
 
 class MarkupMixin(WidgetMarkup):
+    __slots__ = ()
+
     CHECKBOX_CHECKED: str
     CHECKBOX_UNCHECKED: str
 
@@ -37,52 +42,67 @@ class MarkupMixin(WidgetMarkup):
     def add_row(self, row: Sequence) -> None:
         """Add buttons row into markup."""
 
-        buttons_row = []
-        for row_item in row:
-            checkbox = self.get_checkbox_emoji(row_item)
+        self.add_item(
+            self.build_bubbles(
+                self.command, SELECTED_ITEM_KEY, row, self.get_checkbox_labels(row)
+            )
+        )
+
+    def get_checkbox_labels(self, content_items: Sequence) -> List[str]:
+        """Get labels of checkboxes with selected or unselected emoji."""
 
-            buttons_row.append(
-                BubbleElement(
-                    command=self.command,
-                    label=f"{checkbox} {row_item}",
-                    data={SELECTED_ITEM_KEY: row_item},
-                )
+        checked_label = f"{self.CHECKBOX_CHECKED} {{}}".format
+        unchecked_label = f"{self.CHECKBOX_UNCHECKED} {{}}".format
+        checked_items = _as_lookup(self.checked_items)
+
+        return [
+            (
+                checked_label(content_item)
+                if content_item in checked_items
+                else unchecked_label(content_item)
             )
-        self.add_item(buttons_row)
+            for content_item in content_items
+        ]
 
     def add_checkboxes(self) -> None:
         """Generate markup for Checklist widget."""
 
-        for content_item in self.widget_content:
-            if isinstance(content_item, (list, tuple, set)):
-                # if markup is in table format, then add row with buttons
-                self.add_row(content_item)  # type: ignore
-                continue
-
-            checkbox = self.get_checkbox_emoji(content_item)
-            self.add_item(
-                [
-                    BubbleElement(
-                        command=self.command,
-                        label=f"{checkbox} {content_item}",
-                        data={SELECTED_ITEM_KEY: content_item},
-                    )
-                ]
-            )
+        content_items, rows_sizes = self.flatten_rows(self.widget_content)
+        self.add_bubble_rows(
+            self.build_bubbles(
+                self.command,
+                SELECTED_ITEM_KEY,
+                content_items,
+                self.get_checkbox_labels(content_items),
+            ),
+            rows_sizes,
+        )
 
 
 class CheckListWidget(Widget, MarkupMixin):
+    __slots__ = ("widget_content", "selected_item", "checked_items")
+
+    ACTION_KEYS = (SELECTED_ITEM_KEY,)
+    CONTENT_REF_KEYS = (SELECTED_ITEM_KEY, CHECKED_ITEMS_KEY)
     CHECKBOX_CHECKED = strings.CHECKBOX_CHECKED
     CHECKBOX_UNCHECKED = strings.CHECKBOX_UNCHECKED
 
-    def __init__(self, widget_content: Sequence, label: str, *args: Any, **kwargs: Any):
+    def __init__(
+        self,
+        widget_content: Union[Sequence, ContentRef],
+        label: str,
+        *args: Any,
+        **kwargs: Any,
+    ):
         """
-        :param widget_content - All content to be displayed
+        :param widget_content - All content to be displayed or reference
+        to registered content
         :param label - Text of message
         """
         super().__init__(*args, **kwargs)
-        self.widget_content = widget_content
-        self.widget_msg.text = label
+        self.widget_content, self.registered_content = resolve_content(widget_content)
+        self.text = label
+        self.resolve_content_refs()
 
         self.selected_item = self.message.data.get(SELECTED_ITEM_KEY)
         self.checked_items = self.message.metadata.get(CHECKED_ITEMS_KEY, [])
@@ -102,14 +122,43 @@ class CheckListWidget(Widget, MarkupMixin):
 
         self.message.metadata[CHECKED_ITEMS_KEY] = self.checked_items
 
+    def get_state_content(self) -> Optional[Sequence]:
+        return self.widget_content
+
     @classmethod
-    def get_value(cls, message: Message) -> str:
+    def get_value(
+        cls, message: Message, content: Optional[Union[Sequence, ContentRef]] = None
+    ) -> str:
+        """Get selected item.
+
+        :param content - Content of checklist if `content_refs` is enabled
+        """
+        if content is not None:
+            content = resolve_content(content)[0]
+        decode_message(message, content)
         return message.data[SELECTED_ITEM_KEY]
 
     @classmethod
-    def get_checked_items(cls, message: Message) -> List[str]:
+    def get_checked_items(
+        cls, message: Message, content: Optional[Union[Sequence, ContentRef]] = None
+    ) -> List[str]:
+        """Get all checked items.
+
+        :param content - Content of checklist if `content_refs` is enabled
+        """
+        if content is not None:
+            content = resolve_content(content)[0]
+        decode_message(message, content)
         return message.metadata.get(CHECKED_ITEMS_KEY, [])
 
     def add_markup(self) -> None:
         self.add_checkboxes()
         self.add_additional_markup()
+
+
+def _as_lookup(checked_items: List[Any]) -> Collection[Any]:
+    try:
+        return set(checked_items)
+    except TypeError:
+        # unhashable items are looked up in list
+        return checked_items
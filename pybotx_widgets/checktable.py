@@ -1,13 +1,67 @@
-from typing import Any, Dict, Generic, List, Optional, TypeVar, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
 
+from botx import BubbleElement, Message, MessageMarkup
 from pydantic import BaseModel, root_validator
 
 from pybotx_widgets.base import Widget, WidgetMarkup
+from pybotx_widgets.content import ContentRef, resolve_content
 from pybotx_widgets.resources import strings
+from pybotx_widgets.search import MappingIndex, get_mapping_index
+from pybotx_widgets.state import decode_message
 from pybotx_widgets.undefined import Undefined, undefined
 
 T = TypeVar("T")  # noqa: WPS111
 
+PICKER_START_FROM_KEY = "checktable_picker_start_from"
+PICKER_QUERY_KEY = "checktable_picker_query"
+PICKER_VALUE_KEY = "checktable_picker_value"
+PICKER_PAGE_SIZE = 10
+
+if TYPE_CHECKING:
+    ValueMapping = Dict
+else:
+
+    class ValueMapping:
+        """Mapping which is validated once per object and kept as is.
+
+        Large mappings are shared by many checkboxes, so they aren't copied
+        and their labels are checked only when mapping is indexed.
+        Mapping with labels which aren't strings is copied with labels converted
+        to strings, its values are kept as is and aren't converted to `T`.
+        """
+
+        def __class_getitem__(cls, params: Any) -> type:
+            return cls
+
+        @classmethod
+        def __get_validators__(cls) -> Iterator[Callable[[Any], Any]]:
+            yield cls.validate
+
+        @classmethod
+        def validate(cls, mapping: Any) -> Dict[Any, str]:
+            if not isinstance(mapping, dict):
+                raise TypeError("'mapping' should be dict")
+
+            try:
+                get_mapping_index(mapping)
+            except TypeError:
+                mapping = {mapped: str(label) for mapped, label in mapping.items()}
+                get_mapping_index(mapping)
+
+            return mapping
+
 
 class CheckboxContent(BaseModel, Generic[T]):
     """Checkbox content."""
@@ -18,8 +72,8 @@ class CheckboxContent(BaseModel, Generic[T]):
     command: str
     #: value which will be displayed on the button associated with this checkbox.
     checkbox_value: Optional[Union[T, Undefined]] = undefined
-    #: list of available values.
-    mapping: Optional[Dict[T, str]] = None
+    #: labels of available values, use `MappingPickerWidget` to choose from large one.
+    mapping: Optional[ValueMapping[T, str]] = None
     #: extra payload that will be stored in button and then received in new message.
     data: Optional[Dict[str, Any]] = None
 
@@ -45,13 +99,15 @@ class CheckboxContent(BaseModel, Generic[T]):
 
 
 class MarkupMixin(WidgetMarkup):
+    __slots__ = ()
+
     CHECKBOX_CHECKED: str = strings.CHECKBOX_CHECKED
     CHECKBOX_UNCHECKED: str = strings.CHECKBOX_UNCHECKED
     EMPTY: str = strings.EMPTY
     FILL_LABEL: str = strings.FILL_LABEL
     CHOOSE_LABEL: str = strings.CHOOSE_LABEL
 
-    checkboxes: List[CheckboxContent]
+    checkboxes: Sequence[CheckboxContent]
     uncheck_command: str
 
     def get_button_value_text(self, checkbox: CheckboxContent) -> str:
@@ -75,7 +131,15 @@ class MarkupMixin(WidgetMarkup):
     def add_checkboxes(self) -> None:
         """Add checkboxes."""
 
-        for checkbox in self.checkboxes:
+        self.widget_msg.markup.bubbles.extend(self.build_checkbox_rows(self.checkboxes))
+
+    def build_checkbox_rows(
+        self, checkboxes: Sequence[CheckboxContent]
+    ) -> List[List[BubbleElement]]:
+        """Build rows of checkbox and its value buttons."""
+
+        markup = MessageMarkup()
+        for checkbox in checkboxes:
             checkbox.data = checkbox.data or {}
 
             if isinstance(checkbox.checkbox_value, Undefined):
@@ -87,18 +151,20 @@ class MarkupMixin(WidgetMarkup):
 
             value_text = self.get_button_value_text(checkbox)
 
-            self.widget_msg.markup.add_bubble(
-                self.uncheck_command, checkbox_text, data=checkbox.data
-            )
-            self.widget_msg.markup.add_bubble(
+            markup.add_bubble(self.uncheck_command, checkbox_text, data=checkbox.data)
+            markup.add_bubble(
                 checkbox.command, value_text, new_row=False, data=checkbox.data
             )
 
+        return markup.bubbles
+
 
 class ChecktableWidget(Widget, MarkupMixin):
+    __slots__ = ("checkboxes", "uncheck_command")
+
     def __init__(
         self,
-        checkboxes: List[CheckboxContent],
+        checkboxes: Union[List[CheckboxContent], ContentRef],
         label: str,
         uncheck_command: str,
         *args: Any,
@@ -106,16 +172,161 @@ class ChecktableWidget(Widget, MarkupMixin):
     ):
         """Create checktable widget.
 
-        :param checkboxes - All content to be displayed
+        :param checkboxes - All content to be displayed or reference
+        to registered checkboxes
         :param label - Text of message
         :param uncheck_command - Command for handler which uncheck value
         """
         super().__init__(*args, **kwargs)
 
-        self.checkboxes = checkboxes
+        self.checkboxes, self.registered_content = resolve_content(checkboxes)
         self.uncheck_command = uncheck_command
-        self.widget_msg.text = label
+        self.text = label
 
     def add_markup(self) -> None:
-        self.add_checkboxes()
+        if self.registered_content is None:
+            self.add_checkboxes()
+        else:
+            # rows of registered checkboxes are built once per version of them
+            checkbox_rows = self.registered_content.get_artifact(
+                (type(self), self.uncheck_command), self.build_checkbox_rows
+            )
+            self.widget_msg.markup.bubbles.extend(list(row) for row in checkbox_rows)
+
+        self.add_additional_markup()
+
+
+class PickerMarkupMixin(WidgetMarkup):
+    __slots__ = ()
+
+    LEFT_ARROW: str = strings.LEFT_ARROW
+    RIGHT_ARROW: str = strings.RIGHT_ARROW
+
+    mapping_index: MappingIndex
+    found_positions: List[int]
+    start_from: int
+    page_size: int
+
+    message: Message
+    command: str
+
+    def add_entries(self) -> None:
+        """Add bubble of every displayed mapping entry on its own row."""
+
+        positions = self.found_positions[
+            self.start_from : self.start_from + self.page_size
+        ]
+        entries_bubbles = self.build_bubbles(
+            self.command,
+            PICKER_VALUE_KEY,
+            [self.mapping_index.values[position] for position in positions],
+            [self.mapping_index.labels[position] for position in positions],
+        )
+        self.widget_msg.markup.bubbles.extend(
+            [entry_bubble] for entry_bubble in entries_bubbles
+        )
+
+    def add_arrows(self) -> None:
+        """Add arrows to scroll found entries."""
+
+        if self.start_from > 0:
+            self.widget_msg.markup.add_bubble(
+                command=self.message.command.command,
+                label=self.LEFT_ARROW,
+                data={PICKER_START_FROM_KEY: max(self.start_from - self.page_size, 0)},
+            )
+
+        next_start_from = self.start_from + self.page_size
+        if next_start_from < len(self.found_positions):
+            self.widget_msg.markup.add_bubble(
+                command=self.message.command.command,
+                label=self.RIGHT_ARROW,
+                data={PICKER_START_FROM_KEY: next_start_from},
+                new_row=self.start_from == 0,
+            )
+
+
+class MappingPickerWidget(Widget, PickerMarkupMixin):
+    """Paged choice of value from large mapping of checkbox with search by labels."""
+
+    __slots__ = ("mapping_index", "query", "page_size", "start_from", "found_positions")
+
+    ACTION_KEYS = (PICKER_VALUE_KEY,)
+    CONTENT_REF_KEYS = (PICKER_VALUE_KEY,)
+    NOT_FOUND: str = strings.PICKER_NOT_FOUND
+
+    def __init__(
+        self,
+        mapping: Dict[Any, str],
+        label: str,
+        query: Optional[str] = None,
+        page_size: int = PICKER_PAGE_SIZE,
+        *args: Any,
+        **kwargs: Any,
+    ) -> None:
+        """
+        :param mapping - Labels by values, e.g. `CheckboxContent.mapping`
+        :param label - Text of message
+        :param query - New search query, e.g. text typed by user,
+        `None` - keep query from previous message
+        :param page_size - Count of entries on one page
+        """
+        if page_size < 1:
+            raise ValueError("'page_size' should be greater than 0")
+
+        super().__init__(*args, **kwargs)
+
+        self.mapping_index = get_mapping_index(mapping)
+        self.text = label
+        self.query = query
+        self.page_size = page_size
+
+        self.resolve_content_refs()
+        self.load_state()
+
+    def load_state(self) -> None:
+        """Filter entries by search query and load position in found entries."""
+
+        stored_query = self.message.data.get(PICKER_QUERY_KEY, "")
+        query = stored_query if self.query is None else self.query
+
+        if query != stored_query:
+            # new search results are displayed from the beginning
+            self.start_from = 0
+        else:
+            self.start_from = self.message.data.get(PICKER_START_FROM_KEY, 0)
+
+        self.found_positions = self.mapping_index.search(query)
+        self.start_from = min(self.start_from, len(self.found_positions))
+
+        self.message.command.data[PICKER_QUERY_KEY] = query
+        self.message.command.data[PICKER_START_FROM_KEY] = self.start_from
+
+    def get_state_content(self) -> Optional[Sequence]:
+        return self.mapping_index.values
+
+    @classmethod
+    def get_value(
+        cls, message: Message, mapping: Optional[Dict[Any, str]] = None
+    ) -> Any:
+        """Get chosen value.
+
+        :param mapping - Mapping of picker if `content_refs` is enabled
+        """
+        content = None if mapping is None else get_mapping_index(mapping).values
+        decode_message(message, content)
+        return message.data[PICKER_VALUE_KEY]
+
+    async def get_answer(self) -> Any:
+        if PICKER_VALUE_KEY not in self.message.data:
+            return undefined
+
+        return self.message.data[PICKER_VALUE_KEY]
+
+    def add_markup(self) -> None:
+        if not self.found_positions:
+            self.text = f"{self.text}\n{self.NOT_FOUND}"
+
+        self.add_entries()
+        self.add_arrows()
         self.add_additional_markup()
@@ -0,0 +1,189 @@
+"""Registry of widget content which callbacks reference by id."""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from pybotx_widgets.cache import TTLCache
+
+CONTENT_REGISTRY_SIZE = 256
+CONTENT_REGISTRY_TTL = 60 * 60
+
+T = TypeVar("T")  # noqa: WPS111
+
+#: loader is called on request path synchronously, so it shouldn't do I/O
+ContentLoader = Callable[[str], Tuple[Sequence[Any], Hashable]]
+
+
+class ContentNotFoundError(LookupError):
+    """Content isn't registered or it's evicted from registry."""
+
+
+class ContentRef:
+    """Id of registered content which is passed to widgets instead of content."""
+
+    __slots__ = ("content_id",)
+
+    def __init__(self, content_id: str) -> None:
+        self.content_id = content_id
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ContentRef) and other.content_id == self.content_id
+
+    def __hash__(self) -> int:
+        return hash((ContentRef, self.content_id))
+
+    def __repr__(self) -> str:
+        return f"ContentRef({self.content_id!r})"
+
+
+class RegisteredContent:
+    """Version of content with artifacts derived from it, e.g. search index.
+
+    Artifacts are kept until new version of content is registered.
+    """
+
+    __slots__ = ("content_id", "version", "content", "_artifacts")
+
+    def __init__(
+        self, content_id: str, content: Sequence[Any], version: Hashable
+    ) -> None:
+        self.content_id = content_id
+        self.content = content
+        self.version = version
+        self._artifacts: Dict[Hashable, Any] = {}
+
+    def get_artifact(self, name: Hashable, factory: Callable[[Sequence[Any]], T]) -> T:
+        """Get artifact of content, it's built by factory once per version.
+
+        :param name - Name of artifact, e.g. `("rows", command)`
+        :param factory - Builds artifact from content
+        """
+
+        try:
+            return self._artifacts[name]
+        except KeyError:
+            artifact = factory(self.content)
+            self._artifacts[name] = artifact
+            return artifact
+
+
+class ContentRegistry:
+    """LRU registry of content versions with time-to-live."""
+
+    def __init__(
+        self,
+        max_size: int = CONTENT_REGISTRY_SIZE,
+        ttl: Optional[float] = CONTENT_REGISTRY_TTL,
+        loader: ContentLoader = None,
+    ) -> None:
+        """
+        :param max_size - Max count of registered contents
+        :param ttl - Seconds after which content which isn't used is evicted
+        :param loader - Gets content and its version by id when it's missing,
+        e.g. after restart of worker, `None` - missing content is an error.
+        It's called synchronously while widget is created, so it shouldn't do I/O,
+        e.g. it builds content from data which is kept in memory of bot
+        """
+        self.loader = loader
+        self._contents: TTLCache[str, RegisteredContent] = TTLCache(
+            max_size=max_size, ttl=ttl
+        )
+
+    def register(
+        self, content_id: str, content: Sequence[Any], version: Hashable = None
+    ) -> ContentRef:
+        """Register content, it's replaced only if its version changes.
+
+        Content is shared by all users, so it shouldn't contain their own data,
+        e.g. `CheckboxContent` with `checkbox_value` of one user, and messages
+        of `PaginationWidget` are sent to chat of message which displays widget.
+
+        :param content_id - Id of content, e.g. `cities`
+        :param content - Content of widgets
+        :param version - Version of content, e.g. time of update,
+        `None` - content is replaced by every new object
+        """
+
+        registered = self._contents.get(content_id)
+        if registered is None or not _is_same_version(registered, content, version):
+            self._contents.set(
+                content_id, RegisteredContent(content_id, content, version)
+            )
+
+        return ContentRef(content_id)
+
+    def get(self, content_ref: Union[ContentRef, str]) -> RegisteredContent:
+        """Get registered content by reference or id."""
+
+        if isinstance(content_ref, ContentRef):
+            content_id = content_ref.content_id
+        else:
+            content_id = content_ref
+
+        registered = self._contents.get(content_id)
+        if registered is not None:
+            return registered
+
+        if self.loader is None:
+            raise ContentNotFoundError(f"Content '{content_id}' is not registered")
+
+        content, version = self.loader(content_id)
+        self.register(content_id, content, version)
+        return self._contents.get(content_id)  # type: ignore
+
+    def invalidate(self, content_id: str) -> None:
+        """Remove content with all its artifacts."""
+
+        self._contents.pop(content_id)
+
+
+content_registry = ContentRegistry()
+
+
+def get_content_registry() -> ContentRegistry:
+    return content_registry
+
+
+def set_content_registry(registry: ContentRegistry) -> None:
+    """Set registry which content references of all widgets are resolved by."""
+
+    global content_registry  # noqa: WPS420
+    content_registry = registry
+
+
+def register_content(
+    content_id: str, content: Sequence[Any], version: Hashable = None
+) -> ContentRef:
+    """Register content in default registry, see `ContentRegistry.register`."""
+
+    return content_registry.register(content_id, content, version)
+
+
+def resolve_content(
+    content: Union[Sequence[Any], ContentRef]
+) -> Tuple[Sequence[Any], Optional[RegisteredContent]]:
+    """Get content of widget and its registry entry if it's passed by reference."""
+
+    if isinstance(content, ContentRef):
+        registered = content_registry.get(content)
+        return registered.content, registered
+
+    return content, None
+
+
+def _is_same_version(
+    registered: RegisteredContent, content: Sequence[Any], version: Hashable
+) -> bool:
+    if version is None:
+        return registered.content is content
+
+    return registered.version == version
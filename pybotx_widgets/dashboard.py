@@ -0,0 +1,205 @@
+"""Dashboard widget which displays several widgets in one message."""
+
+import inspect
+import json
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from uuid import UUID
+
+from botx import BubbleElement, Message, MessageMarkup
+
+from pybotx_widgets.base import Widget, WidgetMarkup
+from pybotx_widgets.cache import TTLCache
+from pybotx_widgets.service import NESTED_WIDGET_KEY, is_widget_message
+
+CHILD_KEY = "dashboard_child"
+STATE_KEY = "dashboard_state"
+
+SECTIONS_CACHE_SIZE = 10000
+SECTIONS_CACHE_TTL = 3600
+
+ChildFactory = Callable[[Message], Widget]
+# state of child and its rendered markup
+Section = Tuple[str, MessageMarkup]
+
+sections_cache: TTLCache[Hashable, Section] = TTLCache(
+    max_size=SECTIONS_CACHE_SIZE, ttl=SECTIONS_CACHE_TTL
+)
+
+
+class MarkupMixin(WidgetMarkup):
+    __slots__ = ()
+
+    def add_section(self, section_markup: MessageMarkup) -> None:
+        """Add markup of child widget."""
+
+        self.widget_msg.markup = self.merge_markup(
+            self.widget_msg.markup, section_markup
+        )
+
+    @classmethod
+    def build_section_markup(cls, name: str, child: Widget) -> MessageMarkup:
+        """Build markup of child with header and bubbles bound to child."""
+
+        child.add_markup()
+
+        section_markup = MessageMarkup()
+        if child.text:
+            section_markup.add_bubble(command="", label=child.text)
+
+        for row in child.widget_msg.markup.bubbles:
+            section_markup.bubbles.append(
+                [_bind_bubble(name, bubble) for bubble in row]
+            )
+        for row in child.widget_msg.markup.keyboard:  # noqa: WPS440
+            section_markup.keyboard.append(
+                [_bind_bubble(name, button) for button in row]
+            )
+
+        return section_markup
+
+
+class DashboardWidget(Widget, MarkupMixin):
+    """Several widgets in one message which is updated by one call.
+
+    State of every child is kept in its own namespace of message metadata.
+    Callback is handled only by child which bubble was pressed, markup of
+    other children is reused while their state isn't changed.
+    """
+
+    __slots__ = ("factories", "refresh", "owner", "children", "states", "sections")
+
+    def __init__(
+        self,
+        children: Dict[str, ChildFactory],
+        label: str,
+        refresh: Iterable[str] = (),
+        *args: Any,
+        **kwargs: Any,
+    ):
+        """
+        :param children - Factories of child widgets by their names,
+        factory builds widget for message with child's own state
+        :param label - Text of message
+        :param refresh - Names of children which are rendered again even if
+        their state isn't changed, e.g. when their content is changed
+        """
+        super().__init__(*args, **kwargs)
+
+        self.factories = children
+        self.refresh = frozenset(refresh)
+        self.text = label
+
+        self.owner: Optional[str] = self.message.command.data.get(CHILD_KEY)
+        self.children: Dict[str, Widget] = {}
+        self.sections: Dict[str, Section] = {}
+        self.states: Dict[str, Dict[str, Any]] = {
+            **self.message.metadata.get(STATE_KEY, {})
+        }
+
+        if self.owner is not None:
+            self.child(self.owner)
+
+    def child(self, name: str) -> Widget:
+        """Get child widget, it's created from its state on first use."""
+
+        if name in self.children:
+            return self.children[name]
+
+        child_data: Dict[str, Any] = {}
+        if name == self.owner:
+            child_data = {
+                key: data_value
+                for key, data_value in self.message.command.data.items()
+                if key != CHILD_KEY
+            }
+
+        child_message = _build_child_message(
+            self.message, child_data, {**self.states.get(name, {})}
+        )
+        child = self.factories[name](child_message)
+        if name != self.owner:
+            # child which isn't clicked is displayed as it was, not as new widget
+            child.restore_state()
+
+        self.children[name] = child
+        return child
+
+    async def get_child_value(
+        self, name: str, get_value: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Get value of child by helper of its class, e.g. `CalendarWidget.get_value`.
+
+        Helpers get message of child, so they read its state and don't send or
+        update messages, dashboard message is updated by `display`.
+
+        :param name - Name of child
+        :param get_value - Helper which gets message of child and `args`
+        """
+
+        child_value = get_value(self.child(name).message, *args, **kwargs)
+        if inspect.isawaitable(child_value):
+            child_value = await child_value
+
+        return child_value
+
+    def get_state(self) -> Dict[str, Any]:
+        return {STATE_KEY: self.states}
+
+    def add_markup(self) -> None:
+        message_id = self.message.source_sync_id
+        is_pybotx_widget = is_widget_message(self.message)
+
+        for name in self.factories:
+            section = None
+            if is_pybotx_widget and name != self.owner and name not in self.refresh:
+                section = sections_cache.get((message_id, name))
+
+            if section is None or section[0] != _dump_state(self.states.get(name)):
+                section = self.render_section(name)
+
+            self.sections[name] = section
+            self.add_section(section[1])
+
+        self.add_additional_markup()
+
+    def render_section(self, name: str) -> Section:
+        """Render child widget and save its state."""
+
+        child = self.child(name)
+        section_markup = self.build_section_markup(name, child)
+
+        self.states[name] = {
+            key: state_value
+            for key, state_value in child.get_state().items()
+            if key not in child.ACTION_KEYS
+            and key not in {"pybotx_widget", NESTED_WIDGET_KEY}
+        }
+        return _dump_state(self.states[name]), section_markup
+
+    async def display(self) -> Optional[UUID]:
+        message_id = await super().display()
+
+        if message_id is not None:
+            for name, section in self.sections.items():
+                sections_cache.set((message_id, name), section)
+
+        return message_id
+
+
+def _build_child_message(
+    message: Message, data: Dict[str, Any], metadata: Dict[str, Any]
+) -> Message:
+    command = message.incoming_message.command.copy(
+        update={"data": data, "metadata": {**metadata, NESTED_WIDGET_KEY: 1}}
+    )
+    return Message(
+        message.incoming_message.copy(update={"command": command}), message.bot
+    )
+
+
+def _bind_bubble(name: str, bubble: BubbleElement) -> BubbleElement:
+    return bubble.copy(update={"data": {**bubble.data, CHILD_KEY: name}})
+
+
+def _dump_state(state: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(state, sort_keys=True, default=str)
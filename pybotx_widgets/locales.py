@@ -0,0 +1,171 @@
+"""Locales of widget strings and templates."""
+
+import sys
+from types import ModuleType
+from typing import Any, Dict, Optional, Type, TypeVar, Union
+
+from mako.template import Template
+
+from pybotx_widgets.resources import strings, strings_en
+
+DEFAULT_LOCALE = "ru"
+
+T = TypeVar("T")  # noqa: WPS111
+
+Strings = Union[ModuleType, Dict[str, Any]]
+
+
+def _strings_of(source: Strings) -> Dict[str, Any]:
+    if isinstance(source, dict):
+        return source
+
+    return {
+        name: string
+        for name, string in vars(source).items()
+        if name.isupper() and not name.endswith("_DIR")
+    }
+
+
+def _intern(string: Any) -> Any:
+    if isinstance(string, str):
+        return sys.intern(string)
+    elif isinstance(string, tuple):
+        return tuple(_intern(item) for item in string)
+    elif isinstance(string, dict):
+        return {key: _intern(item) for key, item in string.items()}
+
+    return string
+
+
+default_strings = _strings_of(strings)
+#: names of default strings which are kept by widget attributes of other names,
+#: other attributes are named like their strings or like their strings without
+#: prefix, e.g. `RANGE_EDGE_LABEL` keeps `CAL_RANGE_EDGE_LABEL`
+STRING_ALIASES = {"AFTER_SELECT_TEXT": "CAL_DATE_SELECTED"}
+
+
+def _string_name(attr: str) -> Optional[str]:
+    if attr in default_strings:
+        return attr
+    elif attr in STRING_ALIASES:
+        return STRING_ALIASES[attr]
+
+    names = [name for name in default_strings if name.endswith(f"_{attr}")]
+    return names[0] if len(names) == 1 else None
+
+
+class Locale:
+    """Strings and templates of one language, they are resolved once.
+
+    Widget classes with strings of locale are created on first use and kept,
+    so widgets of every locale share caches of static rows and templates.
+    """
+
+    def __init__(
+        self, code: str, overrides: Strings, templates_dir: Optional[str] = None
+    ) -> None:
+        """
+        :param code - Code of locale, e.g. `en`
+        :param overrides - Module or dict with strings which differ from default
+        :param templates_dir - Directory with templates which differ from default
+        """
+        self.code = code
+
+        lookup = strings.lookup
+        if templates_dir is not None:
+            lookup = strings.TemplateFormatterLookup(
+                directories=[templates_dir, strings.TEMPLATES_DIR],
+                input_encoding="utf-8",
+            )
+
+        overrides = _strings_of(overrides)
+        self.strings: Dict[str, Any] = {}
+        for name, default_string in default_strings.items():
+            if name in overrides:
+                self.strings[name] = _intern(overrides[name])
+            elif isinstance(default_string, Template):
+                self.strings[name] = lookup.get_template(default_string.uri)
+            else:
+                self.strings[name] = default_string
+
+        self._widgets: Dict[type, type] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        return self.strings[name]
+
+    def localize(self, widget_cls: Type[T]) -> Type[T]:
+        """Get subclass of widget with strings of locale.
+
+        Attributes are matched with strings by their names, only attributes
+        which keep default strings are replaced, so overrides of subclasses are kept.
+        """
+
+        localized_cls = self._widgets.get(widget_cls)
+        if localized_cls is None:
+            localized_cls = self._build_widget_cls(widget_cls)
+            self._widgets[widget_cls] = localized_cls
+
+        return localized_cls
+
+    def _build_widget_cls(self, widget_cls: Type[T]) -> Type[T]:
+        localized_attrs = {}
+        for attr in dir(widget_cls):
+            if not attr.isupper():
+                continue
+
+            # attributes overridden by subclasses aren't replaced
+            name = _string_name(attr)
+            if name is None or getattr(widget_cls, attr) != default_strings[name]:
+                continue
+
+            if self.strings[name] is not default_strings[name]:
+                localized_attrs[attr] = self.strings[name]
+
+        if not localized_attrs:
+            return widget_cls
+
+        return type(  # type: ignore
+            widget_cls.__name__,
+            (widget_cls,),
+            {
+                "__slots__": (),
+                "__module__": widget_cls.__module__,
+                "locale": self.code,
+                **localized_attrs,
+            },
+        )
+
+
+locales: Dict[str, Locale] = {}
+
+
+def register_locale(
+    code: str, overrides: Strings, templates_dir: Optional[str] = None
+) -> Locale:
+    """Register locale, its strings and templates are resolved at once.
+
+    :param code - Code of locale, e.g. `en`
+    :param overrides - Module or dict with strings which differ from default
+    :param templates_dir - Directory with templates which differ from default
+    """
+
+    locale = Locale(code, overrides, templates_dir)
+    locales[code] = locale
+    return locale
+
+
+def get_locale(code: Optional[str]) -> Locale:
+    """Get locale by code, e.g. `en` or `en-US`, unknown codes get default locale."""
+
+    if code is None:
+        return locales[DEFAULT_LOCALE]
+
+    locale = locales.get(code)
+    if locale is None:
+        locale = locales.get(code.partition("-")[0], locales[DEFAULT_LOCALE])
+
+    return locale
+
+
+register_locale(DEFAULT_LOCALE, {})
+register_locale("en", strings_en, strings_en.TEMPLATES_DIR)
@@ -1,18 +1,36 @@
 """Pagination widget."""
 import asyncio
-from typing import Any, List
+from copy import deepcopy
+from typing import Any, Dict, List, Optional, Sequence, Union
 from uuid import UUID
 
-from botx import SendingMessage
+from botx import SendingCredentials, SendingMessage
 
 from pybotx_widgets.base import Widget, WidgetMarkup
+from pybotx_widgets.content import ContentRef, resolve_content
 from pybotx_widgets.resources import strings
+from pybotx_widgets.sources import (
+    MAX_CURSORS,
+    ContentSource,
+    ContentWindow,
+    CursorIndex,
+    CursorIndexSource,
+    CursorSource,
+    Window,
+    prefetch_neighbors,
+    window_ranges,
+)
 
 START_FROM_KEY = "pagination_start_from"
+#: jumps of page strip are powers of base, e.g. 10 and 100 pages
+PAGE_JUMP_BASE = 10
 MESSAGE_IDS_KEY = "pagination_message_ids"
+PAGE_CURSORS_KEY = "pagination_page_cursors"
 
 
 class MarkupMixin(WidgetMarkup):
+    __slots__ = ()
+
     BACKWARD_BTN_TEMPLATE: strings.FormatTemplate = (
         strings.PAGINATION_BACKWARD_BTN_TEMPLATE
     )
@@ -20,10 +38,18 @@ class MarkupMixin(WidgetMarkup):
         strings.PAGINATION_FORWARD_BTN_TEMPLATE
     )
 
+    FIRST_PAGE_LABEL: str = strings.PAGINATION_FIRST_PAGE_LABEL
+    LAST_PAGE_LABEL: str = strings.PAGINATION_LAST_PAGE_LABEL
+    PAGE_LABEL: str = strings.PAGINATION_PAGE_LABEL
+    CURRENT_PAGE_LABEL: str = strings.PAGINATION_CURRENT_PAGE_LABEL
+    JUMP_BACKWARD_LABEL: str = strings.PAGINATION_JUMP_BACKWARD_LABEL
+    JUMP_FORWARD_LABEL: str = strings.PAGINATION_JUMP_FORWARD_LABEL
+
     paginate_by: int
     start_from: int
     content_len: int
     message_ids: List[UUID]
+    page_strip_size: int
 
     command: str
 
@@ -65,39 +91,199 @@ class MarkupMixin(WidgetMarkup):
             data={START_FROM_KEY: left_border},
         )
 
+    @property
+    def pages_count(self) -> int:
+        return -(-self.content_len // self.paginate_by)
+
+    def add_page_strip(self) -> None:
+        """Add row of pages around current one with buttons of first and last pages.
+
+        [« 1] [4] [·5·] [6] [120 »]
+        [-10] [+10] [+100]
+        """
+
+        pages_count = self.pages_count
+        if pages_count <= 1 or self.page_strip_size <= 0:
+            return
+
+        current_page = self.start_from // self.paginate_by
+        first_page = max(
+            min(
+                current_page - self.page_strip_size // 2,
+                pages_count - self.page_strip_size,
+            ),
+            0,
+        )
+        last_page = min(first_page + self.page_strip_size, pages_count)
+
+        pages_labels = [
+            (page, self.CURRENT_PAGE_LABEL if page == current_page else self.PAGE_LABEL)
+            for page in range(first_page, last_page)
+        ]
+        if first_page > 0:
+            pages_labels.insert(0, (0, self.FIRST_PAGE_LABEL))
+        if last_page < pages_count:
+            pages_labels.append((pages_count - 1, self.LAST_PAGE_LABEL))
+
+        self.widget_msg.markup.bubbles.append(
+            self.build_bubbles(
+                self.command,
+                START_FROM_KEY,
+                [page * self.paginate_by for page, _ in pages_labels],
+                [label.format(page=page + 1) for page, label in pages_labels],
+            )
+        )
+        self.add_page_jumps(current_page, pages_count)
+
+    def add_page_jumps(self, current_page: int, pages_count: int) -> None:
+        """Add row of jumps by 10, 100, ... pages, so any page is a few clicks away.
+
+        Jumps which are covered by row of pages aren't added.
+        """
+
+        jumps = []
+        step = PAGE_JUMP_BASE
+        while step < pages_count:
+            if step > self.page_strip_size // 2:
+                jumps.append(step)
+            step *= PAGE_JUMP_BASE
+
+        pages_labels = [
+            (current_page - step, self.JUMP_BACKWARD_LABEL.format(pages=step))
+            for step in reversed(jumps)
+            if current_page - step >= 0
+        ] + [
+            (current_page + step, self.JUMP_FORWARD_LABEL.format(pages=step))
+            for step in jumps
+            if current_page + step < pages_count
+        ]
+        if not pages_labels:
+            return
+
+        self.widget_msg.markup.bubbles.append(
+            self.build_bubbles(
+                self.command,
+                START_FROM_KEY,
+                [page * self.paginate_by for page, _ in pages_labels],
+                [label for _, label in pages_labels],
+            )
+        )
+
 
 class PaginationWidget(Widget, MarkupMixin):
+    PACKED_ITEMS_SEPARATOR: str = strings.PAGINATION_PACKED_ITEMS_SEPARATOR
+
+    __slots__ = (
+        "widget_content",
+        "paginate_by",
+        "delay_between_messages",
+        "content_len",
+        "start_from",
+        "message_ids",
+        "page_strip_size",
+        "max_packed_chars",
+        "max_packed_lines",
+    )
+
     def __init__(
         self,
-        widget_content: List[SendingMessage],
+        widget_content: Union[Sequence[SendingMessage], ContentRef],
         paginate_by: int,
         delay_between_messages: float = 0.5,
         *args: Any,
-        **kwargs: Any
+        page_strip_size: int = 0,
+        page: Optional[int] = None,
+        max_packed_chars: int = 0,
+        max_packed_lines: int = 0,
+        **kwargs: Any,
     ):
         """
-        :param widget_content - All content to be displayed
+        :param widget_content - All content to be displayed or reference
+        to registered content
         :param paginate_by - Count of content to be displayed
         :param delay_between_messages - Delay between multiple messages
+        :param page_strip_size - Count of pages in row of pages around current one,
+        first and last pages and jumps by 10, 100, ... pages are added to it,
+        `0` - don't show pages
+        :param page - Number of page to be displayed from 1, e.g. typed by user,
+        `None` - page is taken from message
+        :param max_packed_chars - Max count of chars in message which joins text items
+        of page, `0` - no limit
+        :param max_packed_lines - Max count of lines in message which joins text items
+        of page, `0` - no limit. Items are sent one by one if both limits are `0`
         """
         super().__init__(*args, **kwargs)
 
-        self.widget_content = widget_content
+        self.widget_content, self.registered_content = resolve_content(
+            widget_content
+        )
         self.paginate_by = paginate_by
         self.delay_between_messages = delay_between_messages
+        self.page_strip_size = page_strip_size
+        self.max_packed_chars = max_packed_chars
+        self.max_packed_lines = max_packed_lines
+
+        self.content_len = len(self.widget_content)
+        if page is None:
+            self.start_from = self.message.data.get(START_FROM_KEY, 0)
+        else:
+            self.start_from = (max(page, 1) - 1) * paginate_by
+        self.clamp_start_from()
+        self.message_ids = self.message.metadata.get(MESSAGE_IDS_KEY, [])
+
+    @property
+    def empty_msg(self) -> SendingMessage:
+        """Message which replaces missing content on the last page."""
 
-        self.content_len = len(widget_content)
-        self.empty_msg = SendingMessage.from_message(
+        return SendingMessage.from_message(
             text=strings.EMPTY_MSG_SYMBOL, message=self.message
         )
-        self.start_from = self.message.data.get(START_FROM_KEY, 0)
-        self.message_ids = self.message.metadata.get(MESSAGE_IDS_KEY, [])
 
     @property
-    def display_content(self) -> List[SendingMessage]:
+    def display_content(self) -> Sequence[SendingMessage]:
         """Paginated content to be displayed."""
 
-        return self.widget_content[self.start_from : self.start_from + self.paginate_by]
+        display_content = self.widget_content[
+            self.start_from : self.start_from + self.paginate_by
+        ]
+        if self.registered_content is None:
+            return display_content
+
+        # messages are changed while sending, so shared ones are kept untouched,
+        # and they are sent to chat of current message, not of registering one
+        display_content = deepcopy(display_content)
+        for content_message in display_content:
+            content_message.credentials = SendingCredentials(
+                sync_id=self.message.sync_id,
+                chat_id=self.message.group_chat_id,
+                bot_id=self.message.bot_id,
+                host=self.message.host,
+            )
+
+        return display_content
+
+    @property
+    def page_messages(self) -> List[SendingMessage]:
+        """Messages of displayed page, text items are joined in packed mode."""
+
+        display_content = list(self.display_content)
+        if not self.max_packed_chars and not self.max_packed_lines:
+            return display_content
+
+        page_messages: List[SendingMessage] = []
+        packed_items: List[SendingMessage] = []
+        for content_item in display_content:
+            if not self._is_packable(content_item):
+                page_messages += self._pack(packed_items)
+                page_messages.append(content_item)
+                packed_items = []
+            elif not self._fits(packed_items + [content_item]):
+                page_messages += self._pack(packed_items)
+                packed_items = [content_item]
+            else:
+                packed_items.append(content_item)
+
+        return page_messages + self._pack(packed_items)
 
     def add_markup(self) -> None:
         """Get markup with Backward/Forward buttons to control widget."""
@@ -105,55 +291,237 @@ class PaginationWidget(Widget, MarkupMixin):
         if self.content_len > self.paginate_by:
             self.add_backward_btn()
             self.add_forward_btn()
+            self.add_page_strip()
 
-    async def send_widget_message(self) -> None:
+    def get_state(self) -> Dict[str, Any]:
+        return {MESSAGE_IDS_KEY: self.message_ids}
+
+    def clamp_start_from(self) -> None:
+        """Move position past the end of content to the last page."""
+
+        if self.content_len and self.start_from >= self.content_len:
+            self.start_from = (self.pages_count - 1) * self.paginate_by
+
+    async def send_widget_message(self) -> Optional[UUID]:
         """Send or update multiple paginated messages."""
 
-        if self.message_ids:
-            await self._update_widget_messages()
-        else:
-            await self._send_new_widget_messages()
+        # page packed into one message has no ids of other messages
+        if MESSAGE_IDS_KEY in self.message.metadata:
+            return await self._update_widget_messages()
+
+        return await self._send_new_widget_messages()
 
-    async def _send_new_widget_messages(self) -> None:
+    async def _send_new_widget_messages(self) -> Optional[UUID]:
         """Send multiple paginated messages."""
 
-        display_content = self.display_content
-        if not display_content:
-            return
+        page_messages = self.page_messages
+        if not page_messages:
+            return None
 
-        for widget_message in display_content[:-1]:
-            message_id = await self.bot.send(widget_message)
+        for page_index, widget_message in enumerate(page_messages[:-1]):
+            message_id = await self.send_page(widget_message, page_index)
             self.message_ids.append(message_id)
             await asyncio.sleep(self.delay_between_messages)
 
-        last_widget_message = display_content[-1]
+        last_widget_message = page_messages[-1]
         self._prepare_last_message(last_widget_message)
-        await self.bot.send(last_widget_message)
+        return await self.send_page(last_widget_message, len(page_messages) - 1)
 
-    async def _update_widget_messages(self) -> None:
-        """Update multiple paginated messages."""
+    async def _update_widget_messages(self) -> Optional[UUID]:
+        """Update multiple paginated messages.
 
-        display_content = self.display_content
-        for index in range(self.paginate_by - 1):
+        Messages which aren't needed by page are cleared. If packed page needs more
+        messages than were sent, widget is sent again below and all its previous
+        messages are cleared.
+        """
+
+        page_messages = self.page_messages
+        messages_count = len(self.message_ids)
+        if len(page_messages) > messages_count + 1:
+            return await self._resend_widget_messages()
+
+        for index, message_id in enumerate(self.message_ids):
             try:
-                widget_message = display_content[index]
+                widget_message = page_messages[index]
             except IndexError:
                 widget_message = self.empty_msg
 
-            widget_message.credentials.message_id = self.message_ids[index]
-            await self.bot.send(widget_message, update=True)
+            widget_message.credentials.message_id = message_id
+            await self.send_page(widget_message, index, update=True)
             await asyncio.sleep(self.delay_between_messages)
 
         try:
-            last_widget_message = display_content[index + 1]  # noqa: WPS441
+            last_widget_message = page_messages[messages_count]
         except IndexError:
             last_widget_message = self.empty_msg
 
         self._prepare_last_message(last_widget_message)
         last_widget_message.credentials.message_id = self.message.source_sync_id
-        await self.bot.send(last_widget_message, update=True)
+        return await self.send_page(last_widget_message, messages_count, update=True)
+
+    async def _resend_widget_messages(self) -> Optional[UUID]:
+        """Clear all previously sent messages of widget and send page again."""
+
+        previous_messages = []
+        for message_id in [*self.message_ids, self.message.source_sync_id]:
+            previous_message = self.empty_msg
+            previous_message.credentials.message_id = message_id
+            previous_messages.append((previous_message, True))
+
+        with self.trace_span(
+            "pagination.clear", messages_count=len(previous_messages)
+        ):
+            await self.transport.send_many(previous_messages)
+
+        self.message_ids = []
+        return await self._send_new_widget_messages()
+
+    async def send_page(
+        self, widget_message: SendingMessage, page_index: int, update: bool = False
+    ) -> UUID:
+        """Send or update one message of page.
+
+        :param page_index - Index of message on page
+        """
+
+        with self.trace_span("pagination.send", page_index=page_index):
+            self.check_payload(widget_message)
+            return await self.transport.send_or_update(widget_message, update=update)
+
+    def _is_packable(self, message: SendingMessage) -> bool:
+        """Check that message has only text, so it can be joined with others."""
+
+        markup = message.markup
+        options = message.payload.options
+        return bool(
+            message.text
+            and message.file is None
+            and not markup.bubbles
+            and not markup.keyboard
+            and not message.metadata
+            and not options.mentions
+            and options.recipients == "all"
+        )
+
+    def _fits(self, packed_items: List[SendingMessage]) -> bool:
+        """Check that joined text of items fits into limits of packed message."""
+
+        texts = [content_item.text or "" for content_item in packed_items]
+        if self.max_packed_lines:
+            lines_count = sum(text.count("\n") + 1 for text in texts)
+            lines_count += self.PACKED_ITEMS_SEPARATOR.count("\n") * (len(texts) - 1)
+            if lines_count > self.max_packed_lines:
+                return False
+
+        if self.max_packed_chars:
+            chars_count = sum(len(text) for text in texts)
+            chars_count += len(self.PACKED_ITEMS_SEPARATOR) * (len(texts) - 1)
+            return chars_count <= self.max_packed_chars
+
+        return True
+
+    def _pack(self, packed_items: List[SendingMessage]) -> List[SendingMessage]:
+        if len(packed_items) <= 1:
+            return packed_items
+
+        packed_text = self.PACKED_ITEMS_SEPARATOR.join(
+            content_item.text or "" for content_item in packed_items
+        )
+        return [SendingMessage.from_message(text=packed_text, message=self.message)]
 
     def _prepare_last_message(self, message: SendingMessage) -> None:
         self.add_additional_markup()
         message.markup = self.merge_markup(message.markup, self.widget_msg.markup)
-        message.metadata = {**message.metadata, MESSAGE_IDS_KEY: self.message_ids}
+        message.metadata = {**message.metadata, **self.get_state()}
+        self.encode_state(message)
+
+
+class AsyncPaginationWidget(PaginationWidget):
+    """Pagination which loads only displayed messages from asynchronous source."""
+
+    __slots__ = ("content_source",)
+
+    widget_content: ContentWindow
+
+    def __init__(
+        self,
+        content_source: ContentSource,
+        paginate_by: int,
+        *args: Any,
+        **kwargs: Any,
+    ):
+        """
+        :param content_source - Source of `SendingMessage` to be displayed,
+        use shared `PrefetchingSource` to load neighboring pages in advance
+        :param paginate_by - Count of content to be displayed
+        """
+        self.content_source = content_source
+
+        super().__init__(ContentWindow(), paginate_by, *args, **kwargs)
+
+    async def load_content(self) -> None:
+        """Load displayed messages and start prefetching of neighboring pages."""
+
+        self.content_len = await self.content_source.count()
+        self.widget_content.reset(self.content_len)
+        self.clamp_start_from()
+
+        display_content = await self.content_source.fetch(
+            self.start_from, self.paginate_by
+        )
+        # messages are changed while sending, so cached ones are kept untouched
+        self.widget_content.load(self.start_from, deepcopy(display_content))
+
+        prefetch_neighbors(
+            self.content_source,
+            self._page_ranges(-self.paginate_by) + self._page_ranges(self.paginate_by),
+            owner=(self.message.group_chat_id, self.message.user_huid),
+        )
+
+    async def display(self) -> Optional[UUID]:
+        await self.load_content()
+        return await super().display()
+
+    def _page_ranges(self, shift: int) -> List[Window]:
+        return window_ranges(
+            self.start_from + shift, self.paginate_by, self.content_len
+        )
+
+
+class CursorPaginationWidget(AsyncPaginationWidget):
+    """Pagination over source which is read page by page after cursor.
+
+    Sparse index of cursors by page offsets is kept in widget state,
+    so pages are reached from the nearest known cursor.
+    """
+
+    __slots__ = ("cursor_index",)
+
+    content_source: CursorIndexSource
+
+    def __init__(
+        self,
+        cursor_source: CursorSource,
+        paginate_by: int,
+        *args: Any,
+        max_cursors: int = MAX_CURSORS,
+        **kwargs: Any,
+    ):
+        """
+        :param cursor_source - Source of `SendingMessage` to be displayed
+        :param paginate_by - Count of content to be displayed
+        :param max_cursors - Max count of cursors kept in widget state
+        """
+        self.cursor_index = CursorIndex(max_size=max_cursors)
+
+        super().__init__(
+            CursorIndexSource(cursor_source, self.cursor_index),
+            paginate_by,
+            *args,
+            **kwargs,
+        )
+
+        self.cursor_index.load(self.message.metadata.get(PAGE_CURSORS_KEY, []))
+
+    def get_state(self) -> Dict[str, Any]:
+        return {**super().get_state(), PAGE_CURSORS_KEY: self.cursor_index.dump()}
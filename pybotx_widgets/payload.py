@@ -0,0 +1,230 @@
+"""Size profiling and budget of widget message payloads."""
+
+import json
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from botx import MessageMarkup, SendingMessage
+from loguru import logger
+
+from pybotx_widgets.resources import strings
+
+WARN = "warn"
+SPLIT = "split"
+FAIL = "fail"
+
+PAGE_IDS_KEY = "payload_page_ids"
+
+Window = Tuple[int, int]
+
+
+class PayloadTooLargeError(ValueError):
+    """Widget message payload exceeds budget."""
+
+
+class PayloadProfile:
+    """Serialized size of message payload broken down by source."""
+
+    def __init__(self, message: SendingMessage) -> None:
+        self.text = _json_size(message.text)
+        self.labels = 0
+        self.commands = 0
+        self.options = 0
+        self.data = 0
+        self.bubbles_count = 0
+        #: size of every state key with its values in bubbles data and metadata.
+        self.state_keys: DefaultDict[str, int] = defaultdict(int)
+
+        markup = message.markup
+        for row in markup.bubbles + markup.keyboard:  # type: ignore
+            for button in row:
+                self.bubbles_count += 1
+                self.labels += _json_size(button.label)
+                self.commands += _json_size(button.command)
+                self.options += _json_size(button.opts.dict())
+                self.data += _json_size(button.data)
+                self._add_state_keys(button.data)
+
+        self.metadata = _json_size(message.metadata)
+        self._add_state_keys(message.metadata)
+
+        self.markup = _json_size(json.loads(markup.json()))
+        self.total = _json_size(json.loads(message.payload.json()))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "markup": self.markup,
+            "text": self.text,
+            "labels": self.labels,
+            "commands": self.commands,
+            "options": self.options,
+            "data": self.data,
+            "metadata": self.metadata,
+            "bubbles_count": self.bubbles_count,
+            "state_keys": dict(self.state_keys),
+        }
+
+    def _add_state_keys(self, state: Dict[str, Any]) -> None:
+        for key, state_value in state.items():
+            self.state_keys[key] += _json_size(key) + _json_size(state_value)
+
+
+class PayloadProfiler:
+    """Collect payload profiles of every widget render."""
+
+    def __init__(self) -> None:
+        self.profiles: DefaultDict[str, List[PayloadProfile]] = defaultdict(list)
+
+    def record(self, widget_name: str, profile: PayloadProfile) -> None:
+        self.profiles[widget_name].append(profile)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Get renders count, max and average payload size per widget."""
+
+        return {
+            widget_name: {
+                "renders": len(profiles),
+                "max_total": max(profile.total for profile in profiles),
+                "avg_total": sum(profile.total for profile in profiles)
+                // len(profiles),
+            }
+            for widget_name, profiles in self.profiles.items()
+        }
+
+
+class PayloadBudget:
+    """Max size of widget message payload and what to do if it's exceeded.
+
+    `warn` - log warning, `split` - split bubbles into several messages,
+    `fail` - raise `PayloadTooLargeError` before message is sent.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        action: str = WARN,
+        profiler: Optional[PayloadProfiler] = None,
+    ) -> None:
+        """
+        :param max_size - Max size of serialized payload, `None` - only profile
+        :param action - One of `warn`, `split` or `fail`
+        :param profiler - Profiler which records payload of every render
+        """
+        if action not in {WARN, SPLIT, FAIL}:
+            raise ValueError(f"Unknown payload budget action '{action}'")
+
+        self.max_size = max_size
+        self.action = action
+        self.profiler = profiler
+
+    def check(
+        self, message: SendingMessage, widget_name: str, splittable: bool = False
+    ) -> PayloadProfile:
+        """Profile message payload, warn or fail if it exceeds budget.
+
+        :param splittable - Message will be split, so don't warn about its size
+        """
+
+        profile = PayloadProfile(message)
+        if self.profiler is not None:
+            self.profiler.record(widget_name, profile)
+
+        if not self.is_exceeded(profile):
+            return profile
+
+        error_text = (
+            f"{widget_name} payload is {profile.total} bytes, "
+            f"budget is {self.max_size} bytes: {profile.as_dict()}"
+        )
+        if self.action == FAIL:
+            raise PayloadTooLargeError(error_text)
+        elif self.action == WARN or not splittable:
+            logger.warning(error_text)
+
+        return profile
+
+    def apply(self, message: SendingMessage, widget_name: str) -> List[SendingMessage]:
+        """Check message payload, return it or its parts that fit in budget."""
+
+        profile = self.check(message, widget_name, splittable=True)
+        if self.action == SPLIT and self.is_exceeded(profile):
+            return self.split(message, profile)
+
+        return [message]
+
+    def is_exceeded(self, profile: PayloadProfile) -> bool:
+        return self.max_size is not None and profile.total > self.max_size
+
+    def split(
+        self, message: SendingMessage, profile: PayloadProfile
+    ) -> List[SendingMessage]:
+        """Split bubbles rows into messages that fit in budget."""
+
+        # text and keyboard are kept in the first message, metadata is in every one
+        page_overhead = (
+            profile.total
+            - profile.markup
+            + _json_size(
+                json.loads(MessageMarkup(keyboard=message.markup.keyboard).json())
+            )
+        )
+        rows_sizes = [
+            _json_size([json.loads(bubble.json()) for bubble in row]) + 1
+            for row in message.markup.bubbles
+        ]
+
+        # every message also keeps ids of all messages, which count isn't known yet
+        pages_count = 1
+        while True:  # noqa: WPS457
+            pages_rows = self._split_rows(
+                rows_sizes, page_overhead + _page_ids_size(pages_count)
+            )
+            if len(pages_rows) <= pages_count:
+                break
+            pages_count = len(pages_rows)
+
+        return [
+            SendingMessage(
+                text=message.text if page_number == 0 else strings.EMPTY_MSG_SYMBOL,
+                credentials=message.credentials.copy(),
+                markup=MessageMarkup(
+                    bubbles=message.markup.bubbles[first_row:last_row],
+                    keyboard=message.markup.keyboard if page_number == 0 else [],
+                ),
+                metadata=message.metadata,
+            )
+            for page_number, (first_row, last_row) in enumerate(pages_rows)
+        ]
+
+    def _split_rows(self, rows_sizes: List[int], page_overhead: int) -> List[Window]:
+        assert self.max_size is not None
+
+        if page_overhead >= self.max_size:
+            raise PayloadTooLargeError(
+                f"Payload without bubbles is {page_overhead} bytes, "
+                f"budget is {self.max_size} bytes"
+            )
+
+        pages_rows: List[Window] = []
+        first_row = 0
+        page_size = page_overhead
+        for row_index, row_size in enumerate(rows_sizes):
+            if row_index > first_row and page_size + row_size > self.max_size:
+                pages_rows.append((first_row, row_index))
+                first_row = row_index
+                page_size = page_overhead
+
+            page_size += row_size
+
+        pages_rows.append((first_row, len(rows_sizes)))
+        return pages_rows
+
+
+def _page_ids_size(pages_count: int) -> int:
+    return _json_size({PAGE_IDS_KEY: [str(UUID(int=0))] * pages_count})
+
+
+def _json_size(payload_value: Any) -> int:
+    return len(json.dumps(payload_value, default=str))
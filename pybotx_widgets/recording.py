@@ -0,0 +1,23 @@
+"""Recorder of widget callbacks which is called when widget is created.
+
+Recorder itself is in `pybotx_widgets.replay`, so it's imported only when
+callbacks are recorded.
+"""
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from pybotx_widgets.replay import CallbackRecorder  # noqa: F401
+
+recorder: Optional["CallbackRecorder"] = None
+
+
+def get_recorder() -> Optional["CallbackRecorder"]:
+    return recorder
+
+
+def set_recorder(new_recorder: Optional["CallbackRecorder"]) -> None:
+    """Set recorder of all widgets, `None` - stop recording."""
+
+    global recorder  # noqa: WPS420
+    recorder = new_recorder
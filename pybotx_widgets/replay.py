@@ -0,0 +1,546 @@
+"""Recording of widget callbacks and their replay under profilers.
+
+python -m pybotx_widgets.replay callbacks.pickle --top 30
+"""
+
+import asyncio
+import copy
+import hashlib
+import importlib
+import os
+import pickle  # noqa: S403
+import random
+import re
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from uuid import UUID, uuid5
+
+from botx import Bot, Message, SendingCredentials, SendingMessage
+from loguru import logger
+from pydantic import BaseModel
+
+from pybotx_widgets import recording
+from pybotx_widgets.state import ISO_DATE_PATTERN, UUID_PATTERN, decode_state
+
+if TYPE_CHECKING:
+    import tracemalloc  # noqa: F401
+
+    from pybotx_widgets.testing import FakeBot  # noqa: F401
+
+DEFAULT_TOP = 20
+#: records are written to file by batches of this size
+FLUSH_SIZE = 100
+#: records are skipped while this count of batches waits for writing
+MAX_PENDING_FLUSHES = 10
+MASKED_CHAR = "x"
+#: fields of sender which identify user or their device
+SENDER_ID_FIELDS = ("user_huid", "group_chat_id")
+SENDER_CLEARED_FIELDS = (
+    "ad_login",
+    "ad_domain",
+    "username",
+    "manufacturer",
+    "device",
+    "device_software",
+    "device_meta",
+    "platform",
+    "platform_package_id",
+    "app_version",
+)
+#: keyword arguments and fields of models which strings are masked by
+#: `scrub_arguments`, strings of positional arguments are masked too
+MASKED_FIELDS = frozenset(
+    ("widget_content", "content", "text", "label", "body", "mapping")
+)
+#: name of positional arguments of widget for `scrub_arguments`
+POSITIONAL_FIELD = "content"
+
+Arguments = Tuple[Tuple[Any, ...], Dict[str, Any]]
+
+# hook of widgets is in small module, so widgets don't import replay
+get_recorder = recording.get_recorder
+set_recorder = recording.set_recorder
+
+_word_chars = re.compile(r"\w")
+
+
+class Placeholder:
+    """Recorded argument which is replaced on replay, e.g. message or bot."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return Placeholder, (self.name,)
+
+
+MESSAGE = Placeholder("message")
+BOT = Placeholder("bot")
+
+
+class CallbackRecord:
+    """Anonymized incoming message and arguments of widget created for it."""
+
+    __slots__ = ("widget", "locale", "args", "kwargs", "message", "recorded_at")
+
+    def __init__(  # noqa: WPS211
+        self,
+        widget: str,
+        locale: Optional[str],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        message: Dict[str, Any],
+        recorded_at: float,
+    ) -> None:
+        """
+        :param widget - Import path of widget class, `module:name`
+        :param locale - Locale of widget class
+        :param args - Positional arguments of widget, message and bot are placeholders
+        :param kwargs - Keyword arguments of widget
+        :param message - Anonymized incoming message as it's received from botx
+        :param recorded_at - Timestamp of record
+        """
+        self.widget = widget
+        self.locale = locale
+        self.args = args
+        self.kwargs = kwargs
+        self.message = message
+        self.recorded_at = recorded_at
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+    def get_widget_cls(self) -> type:
+        module_name, _, cls_name = self.widget.partition(":")
+        widget_cls = getattr(importlib.import_module(module_name), cls_name)
+        return widget_cls.for_locale(self.locale)
+
+    def build_widget(self, bot: "FakeBot") -> Any:
+        """Create widget for recorded message like handler did."""
+
+        message = Message.from_dict(self.message, bot)  # type: ignore
+        placeholders = {MESSAGE.name: message, BOT.name: bot}
+
+        def replace(argument: Any) -> Any:  # noqa: WPS430
+            if isinstance(argument, Placeholder):
+                return placeholders[argument.name]
+            elif isinstance(argument, SendingMessage):
+                return _bind_to_message(argument, message)
+            elif type(argument) in {list, tuple}:
+                return type(argument)(map(replace, argument))
+            elif type(argument) is dict:
+                return {key: replace(item) for key, item in argument.items()}
+            return argument
+
+        return self.get_widget_cls()(
+            *map(replace, self.args),
+            **{name: replace(argument) for name, argument in self.kwargs.items()},
+        )
+
+
+class CallbackRecorder:
+    """Records anonymized callbacks of widgets into file, it's opt-in.
+
+    Users and chats get stable pseudonyms within one recorder, logins, device info,
+    files and arguments of command are dropped or masked, strings of widget state
+    except dates and ids are masked. Arguments of widgets are scrubbed by
+    `scrub_arguments` by default, so replayed widgets can miss content which is
+    found by masked strings.
+
+    Records are buffered in memory and written by batches in background thread,
+    so file isn't written on request path, call `close` to write the rest.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float = 1,
+        max_records: Optional[int] = None,
+        scrub: Optional[Callable[..., Arguments]] = None,
+        flush_size: int = FLUSH_SIZE,
+    ) -> None:
+        """
+        :param path - File which records are appended to
+        :param sample_rate - Share of widgets which are recorded
+        :param max_records - Max count of records, `None` - unlimited
+        :param scrub - Function which gets arguments and keyword arguments of widget
+        and returns them without sensitive content, `None` - `scrub_arguments`
+        :param flush_size - Count of buffered records which are written at once
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_records = max_records
+        self.scrub = scrub or scrub_arguments
+        self.flush_size = flush_size
+
+        self.recorded = 0
+        self.skipped = 0
+        self._salt = os.urandom(16)
+        self._file: Optional[IO[bytes]] = None
+        self._buffer: List[bytes] = []
+        self._flushes: List["Future[None]"] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def record(
+        self, widget_cls: type, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        """Record message and arguments of widget which is being created."""
+
+        if self.max_records is not None and self.recorded >= self.max_records:
+            return
+
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:  # noqa: S311
+            return
+
+        self._flushes = [flush for flush in self._flushes if not flush.done()]
+        if len(self._flushes) >= MAX_PENDING_FLUSHES:
+            # disk is slower than callbacks, records are dropped, not piled up
+            self.skipped += 1
+            return
+
+        message = kwargs.get("message")
+        if message is None:
+            message = next(
+                (argument for argument in args if isinstance(argument, Message)), None
+            )
+        if message is None:
+            return
+
+        args = tuple(map(_placeholder, args))
+        kwargs = {
+            name: _placeholder(argument, name) for name, argument in kwargs.items()
+        }
+        args, kwargs = self.scrub(args, kwargs)
+
+        widget_record = CallbackRecord(
+            widget=_import_path(widget_cls),
+            locale=getattr(widget_cls, "locale", None),
+            args=args,
+            kwargs=kwargs,
+            message=self.anonymize(message),
+            recorded_at=time.time(),
+        )
+        try:
+            dumped_record = pickle.dumps(widget_record.as_dict())
+        except Exception as exc:
+            # e.g. content source with connection can't be replayed
+            self.skipped += 1
+            logger.debug(f"Callback of {widget_record.widget} isn't recorded: {exc!r}")
+            return
+
+        self._buffer.append(dumped_record)
+        self.recorded += 1
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered records to file in background thread."""
+
+        if not self._buffer:
+            return
+
+        if self._executor is None:
+            # one thread keeps records in order they were recorded
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        dumped_records, self._buffer = self._buffer, []
+        self._flushes.append(self._executor.submit(self._write, dumped_records))
+
+    def anonymize(self, message: Message) -> Dict[str, Any]:
+        """Get incoming message without data which identifies user."""
+
+        incoming = message.incoming_message.dict(by_alias=True)
+
+        sender = incoming["from"]
+        for field in SENDER_ID_FIELDS:
+            if sender.get(field) is not None:
+                sender[field] = self._pseudonym(sender[field])
+        for field in SENDER_CLEARED_FIELDS:
+            sender.pop(field, None)
+        sender["host"] = self._pseudonym(sender["host"]).hex
+
+        command, _, command_args = incoming["command"]["body"].partition(" ")
+        if command_args:
+            command = f"{command} {_mask(command_args)}"
+        incoming["command"]["body"] = command
+        for state_field in ("data", "metadata"):
+            incoming["command"][state_field] = _mask_state(
+                decode_state(incoming["command"][state_field])
+            )
+
+        incoming["file"] = None
+        incoming["async_files"] = []
+        incoming["entities"] = []
+        incoming["attachments"] = []
+        return incoming
+
+    def close(self) -> None:
+        """Write buffered records and close file, it blocks until they are written."""
+
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._flushes = []
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, dumped_records: List[bytes]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "ab")  # noqa: WPS515
+
+        self._file.write(b"".join(dumped_records))
+        self._file.flush()
+
+    def _pseudonym(self, identifier: Any) -> UUID:
+        digest = hashlib.sha256(self._salt + str(identifier).encode()).digest()
+        return uuid5(UUID(bytes=digest[:16]), "pybotx_widgets")
+
+
+def scrub_arguments(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Arguments:
+    """Hide content of widget arguments, default scrub of `CallbackRecorder`.
+
+    Credentials of sent messages are replaced by placeholder of incoming message,
+    their texts, labels of their markup, strings of positional arguments and of
+    `MASKED_FIELDS` arguments and model fields are masked, files are dropped.
+    """
+
+    return (
+        tuple(_scrub(argument, POSITIONAL_FIELD) for argument in args),
+        {name: _scrub(argument, name) for name, argument in kwargs.items()},
+    )
+
+
+def load_records(path: str) -> Iterator[CallbackRecord]:
+    """Read records of file in order they were recorded.
+
+    Records are unpickled, so only files recorded by trusted recorder can be loaded,
+    unpickling of crafted file executes arbitrary code.
+    """
+
+    with open(path, "rb") as records_file:
+        while True:
+            try:
+                widget_record = pickle.load(records_file)  # noqa: S301
+            except EOFError:
+                return
+
+            yield CallbackRecord(**widget_record)
+
+
+class ReplayReport:
+    """Results of replay: time, errors, hot spots and allocation tops."""
+
+    def __init__(self) -> None:
+        self.replayed = 0
+        self.errors: Dict[str, int] = {}
+        self.duration = 0.0
+        self.hot_spots = ""
+        self.allocations: List["tracemalloc.Statistic"] = []
+
+    def format(self) -> str:  # noqa: WPS125
+        lines = [
+            f"Replayed {self.replayed} callbacks in {self.duration:.2f}s",
+            *(f"  {count} x {error}" for error, count in self.errors.items()),
+            "",
+            "Hot spots:",
+            self.hot_spots,
+            "Allocation tops:",
+            *(str(statistic) for statistic in self.allocations),
+        ]
+        return "\n".join(lines)
+
+
+class ReplayRunner:
+    """Feeds recorded callbacks through widgets against fake botx API."""
+
+    def __init__(
+        self, records: List[CallbackRecord], bot: Optional["FakeBot"] = None
+    ) -> None:
+        """
+        :param records - Recorded callbacks
+        :param bot - Fake botx API, messages aren't kept by default
+        """
+        # fakes and profilers aren't imported by widgets which are only recorded
+        from pybotx_widgets.testing import FakeBot  # noqa: WPS433, F811
+
+        self.records = records
+        self.bot = bot or FakeBot(keep_messages=False)
+
+    async def run(self, report: ReplayReport = None) -> ReplayReport:
+        """Display widget of every record one by one."""
+
+        report = report or ReplayReport()
+        started_at = time.perf_counter()
+        for widget_record in self.records:
+            try:
+                await widget_record.build_widget(self.bot).display()
+            except Exception as exc:
+                error = f"{widget_record.widget}: {exc!r}"
+                report.errors[error] = report.errors.get(error, 0) + 1
+            else:
+                report.replayed += 1
+
+        report.duration += time.perf_counter() - started_at
+        return report
+
+    async def profile(
+        self, top: int = DEFAULT_TOP, sort_by: str = "tottime"
+    ) -> ReplayReport:
+        """Replay records under `cProfile` and `tracemalloc`.
+
+        :param top - Count of functions and allocation lines in report
+        :param sort_by - Key of `pstats` sorting
+        """
+        import cProfile  # noqa: WPS433
+        import io  # noqa: WPS433
+        import pstats  # noqa: WPS433
+        import tracemalloc  # noqa: WPS433, F811
+
+        # modules of widgets are imported before, so imports aren't profiled
+        for widget_path in {widget_record.widget for widget_record in self.records}:
+            importlib.import_module(widget_path.partition(":")[0])
+
+        report = ReplayReport()
+        profiler = cProfile.Profile()
+
+        tracemalloc.start()
+        profiler.enable()
+        try:
+            await self.run(report)
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(sort_by).print_stats(top)
+        report.hot_spots = stream.getvalue()
+        report.allocations = snapshot.statistics("lineno")[:top]
+        return report
+
+
+def _placeholder(argument: Any, name: Optional[str] = None) -> Any:
+    if name == MESSAGE.name or isinstance(argument, Message):
+        return MESSAGE
+    elif name == BOT.name or _is_bot(argument):
+        return BOT
+
+    return argument
+
+
+def _is_bot(argument: Any) -> bool:
+    if isinstance(argument, Bot):
+        return True
+
+    # fake bot can be passed only if testing module is imported
+    testing = sys.modules.get("pybotx_widgets.testing")
+    return testing is not None and isinstance(argument, testing.FakeBot)
+
+
+def _scrub(argument: Any, name: Optional[str] = None) -> Any:  # noqa: C901
+    if isinstance(argument, Placeholder):
+        return argument
+    elif isinstance(argument, SendingMessage):
+        scrubbed_message = copy.copy(argument)
+        scrubbed_message.credentials = MESSAGE  # type: ignore
+        scrubbed_message.payload = _scrub(argument.payload)
+        return scrubbed_message
+    elif isinstance(argument, str):
+        return _mask(argument) if name in MASKED_FIELDS else argument
+    elif isinstance(argument, BaseModel):
+        return argument.copy(
+            update={
+                field: None if field == "file" else _scrub(field_value, field)
+                for field, field_value in argument
+            }
+        )
+    elif type(argument) in {list, tuple}:
+        return type(argument)(_scrub(item, name) for item in argument)
+    elif type(argument) is dict:
+        return {key: _scrub(item, name) for key, item in argument.items()}
+
+    return argument
+
+
+def _mask_state(state_value: Any) -> Any:
+    if isinstance(state_value, str):
+        if ISO_DATE_PATTERN.fullmatch(state_value) or UUID_PATTERN.fullmatch(
+            state_value
+        ):
+            return state_value
+        return _mask(state_value)
+    elif isinstance(state_value, list):
+        return [_mask_state(item) for item in state_value]
+    elif isinstance(state_value, dict):
+        return {key: _mask_state(item) for key, item in state_value.items()}
+
+    return state_value
+
+
+def _mask(text: str) -> str:
+    return _word_chars.sub(MASKED_CHAR, text)
+
+
+def _bind_to_message(sending_message: SendingMessage, message: Message) -> Any:
+    if not isinstance(sending_message.credentials, Placeholder):
+        return sending_message
+
+    bound_message = copy.copy(sending_message)
+    bound_message.credentials = SendingCredentials(
+        sync_id=message.sync_id,
+        chat_id=message.group_chat_id,
+        bot_id=message.bot_id,
+        host=message.host,
+    )
+    return bound_message
+
+
+def _import_path(widget_cls: type) -> str:
+    # localized classes are created on the fly, so their base class is imported
+    for importable_cls in widget_cls.__mro__:
+        module_cls = getattr(
+            importlib.import_module(importable_cls.__module__),
+            importable_cls.__qualname__,
+            None,
+        )
+        if module_cls is importable_cls:
+            return f"{importable_cls.__module__}:{importable_cls.__qualname__}"
+
+    raise TypeError(f"Widget class {widget_cls!r} can't be imported")
+
+
+def main() -> None:
+    import argparse  # noqa: WPS433
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="file with recorded callbacks")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument("--sort-by", default="tottime")
+    parser.add_argument("--repeat", type=int, default=1, help="replays of records")
+    args = parser.parse_args()
+
+    records = list(load_records(args.path)) * args.repeat
+    report = asyncio.run(ReplayRunner(records).profile(args.top, args.sort_by))
+    print(report.format())  # noqa: WPS421
+
+
+if __name__ == "__main__":
+    # records refer to placeholders of package module, not of `__main__`
+    from pybotx_widgets import replay  # noqa: WPS433
+
+    replay.main()
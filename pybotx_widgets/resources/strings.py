@@ -62,12 +62,19 @@ CANCEL = "Отмена"
 CAL_DATE_SELECTED = "Дата выбрана"
 SELECT_CALENDAR = "Выберите календарь"
 SELECT_DATE = "Выберите дату"
+SELECT_RANGE_END = "Выберите конец периода"
+CAL_RANGE_HAS_UNAVAILABLE_DAYS = (
+    "В периоде есть недоступные даты, выберите другой конец"
+)
+CAL_RANGE_EDGE_LABEL = "[{day}]"
+CAL_RANGE_DAY_LABEL = "·{day}·"
 # ========
 
 SELECTED_VALUE_LABEL = "{label} {selected_val}"
 CHOOSE_LABEL = "Выбрать"
 FILL_LABEL = "Ввести"
 EMPTY = "[Пусто]"
+PICKER_NOT_FOUND = "Ничего не найдено"
 
 LEFT_ARROW = "⬅️"
 RIGHT_ARROW = "➡️"
@@ -87,4 +94,12 @@ PAGINATION_BACKWARD_BTN_TEMPLATE = lookup.get_template(
 )
 PAGINATION_FORWARD_BTN_TEMPLATE = lookup.get_template("pagination_forward_btn.txt.mako")
 
+PAGINATION_FIRST_PAGE_LABEL = "« {page}"
+PAGINATION_LAST_PAGE_LABEL = "{page} »"
+PAGINATION_PAGE_LABEL = "{page}"
+PAGINATION_CURRENT_PAGE_LABEL = "·{page}·"
+PAGINATION_JUMP_BACKWARD_LABEL = "-{pages}"
+PAGINATION_JUMP_FORWARD_LABEL = "+{pages}"
+PAGINATION_PACKED_ITEMS_SEPARATOR = "\n"
+
 EMPTY_MSG_SYMBOL = "-"
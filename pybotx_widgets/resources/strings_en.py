@@ -0,0 +1,45 @@
+"""English text and templates for messages, missing ones are taken from `strings`."""
+import os
+
+from pybotx_widgets.resources.strings import TEMPLATES_DIR as DEFAULT_TEMPLATES_DIR
+
+TEMPLATES_DIR = os.path.join(DEFAULT_TEMPLATES_DIR, "en")
+
+# ====Calendar====
+MONTHS = {  # noqa: WPS407
+    1: "Jan",
+    2: "Feb",
+    3: "Mar",
+    4: "Apr",
+    5: "May",
+    6: "Jun",
+    7: "Jul",
+    8: "Aug",
+    9: "Sep",
+    10: "Oct",
+    11: "Nov",
+    12: "Dec",
+}
+WEEKDAYS = (
+    "Mo",
+    "Tu",
+    "We",
+    "Th",
+    "Fr",
+    "Sa",
+    "Su",
+)
+CAL_DATE_SKIPPED = "Date skipped"
+SKIP = "Skip"
+CANCEL = "Cancel"
+CAL_DATE_SELECTED = "Date selected"
+SELECT_CALENDAR = "Select calendar"
+SELECT_DATE = "Select date"
+SELECT_RANGE_END = "Select end of period"
+CAL_RANGE_HAS_UNAVAILABLE_DAYS = "Period has unavailable dates, select another end"
+# ========
+
+CHOOSE_LABEL = "Choose"
+FILL_LABEL = "Fill"
+EMPTY = "[Empty]"
+PICKER_NOT_FOUND = "Nothing found"
@@ -0,0 +1,8 @@
+<% LEFT_ARROW = "⬅️️" %>\
+${LEFT_ARROW} Back to [\
+% if left_num == right_num:
+${ left_num }\
+% else:
+${ left_num }-${ right_num }\
+% endif
+]\
@@ -0,0 +1,8 @@
+<% RIGHT_ARROW = "➡️" %>\
+${RIGHT_ARROW} Forward to [\
+% if left_num == right_num:
+${ left_num }\
+% else:
+${ left_num }-${ right_num }\
+% endif
+]\
@@ -0,0 +1,199 @@
+"""Search index for widget content."""
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from pybotx_widgets.cache import TTLCache
+
+INDEX_CACHE_SIZE = 128
+INDEX_CACHE_TTL = 60 * 60
+MAPPING_INDEX_CACHE_SIZE = 256
+QUERY_CACHE_SIZE = 64
+TRIGRAM_LEN = 3
+
+
+class ContentIndex:
+    """Prefix and trigram index over widget content.
+
+    Query terms shorter than trigram are matched as word prefixes,
+    longer terms are matched as substrings.
+    """
+
+    def __init__(self, content: Sequence) -> None:
+        """
+        :param content - Content to be indexed, items are matched by `str()`
+        """
+        self.content = content
+        self._words: List[Tuple[str, int]] = []
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+        self._texts: List[str] = []
+        self._queries: TTLCache[str, List[int]] = TTLCache(max_size=QUERY_CACHE_SIZE)
+
+        for index, content_item in enumerate(content):
+            text = _item_text(content_item)
+            self._texts.append(text)
+            self._words.extend((word, index) for word in set(text.split()))
+
+            for trigram in _trigrams(text):
+                self._trigrams[trigram].append(index)
+
+        self._words.sort()
+
+    def search(self, query: str) -> List[int]:
+        """Get sorted indexes of content items matched by all query terms."""
+
+        query = query.casefold().strip()
+        if not query:
+            return list(range(len(self.content)))
+
+        found = self._queries.get(query)
+        if found is None:
+            found = self._search(query)
+            self._queries.set(query, found)
+
+        return found
+
+    def filter(self, query: str) -> List[Any]:  # noqa: WPS125
+        """Get content items matched by query."""
+
+        return [self.content[index] for index in self.search(query)]
+
+    def _search(self, query: str) -> List[int]:
+        found: Optional[Set[int]] = None
+
+        for term in query.split():
+            if len(term) < TRIGRAM_LEN:
+                matched = self._match_prefix(term)
+            else:
+                matched = self._match_substring(term)
+
+            found = matched if found is None else found & matched
+            if not found:
+                return []
+
+        return sorted(found or ())
+
+    def _match_prefix(self, prefix: str) -> Set[int]:
+        matched = set()
+        words = self._words
+
+        for position in range(bisect_left(words, (prefix,)), len(words)):
+            word, index = words[position]
+            if not word.startswith(prefix):
+                break
+            matched.add(index)
+
+        return matched
+
+    def _match_substring(self, term: str) -> Set[int]:
+        postings = sorted(
+            (self._trigrams.get(trigram, []) for trigram in _trigrams(term)), key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+
+        return {index for index in candidates if term in self._texts[index]}
+
+
+_indexes: TTLCache[Hashable, ContentIndex] = TTLCache(
+    max_size=INDEX_CACHE_SIZE, ttl=INDEX_CACHE_TTL
+)
+
+
+def get_content_index(
+    content: Sequence, content_version: Optional[Hashable] = None
+) -> ContentIndex:
+    """Get cached index for content, index is built once per content version.
+
+    :param content - Content to be indexed
+    :param content_version - Version of content, if `None` - hash of content is used
+    """
+
+    if content_version is None:
+        cache_key: Hashable = ("hash", hash(tuple(map(_item_key, content))))
+    else:
+        cache_key = ("version", content_version)
+
+    index = _indexes.get(cache_key)
+    if index is None:
+        index = ContentIndex(content)
+        _indexes.set(cache_key, index)
+
+    return index
+
+
+class MappingIndex:
+    """Values of mapping sorted by their labels with search over labels."""
+
+    def __init__(self, mapping: Dict[Any, str]) -> None:
+        """
+        :param mapping - Labels by values, labels should be strings
+        """
+        for label in mapping.values():
+            if not isinstance(label, str):
+                raise TypeError(f"Label of mapping should be string, not {label!r}")
+
+        self.mapping = mapping
+        self.values = sorted(mapping, key=lambda mapped: mapping[mapped].casefold())
+        self.labels = [mapping[mapped] for mapped in self.values]
+        self._content_index: Optional[ContentIndex] = None
+
+    def search(self, query: str) -> List[int]:
+        """Get positions of sorted values which labels are matched by query."""
+
+        if not query.strip():
+            return list(range(len(self.values)))
+
+        # search index isn't needed for paging only, so it's built on first query
+        if self._content_index is None:
+            self._content_index = ContentIndex(self.labels)
+
+        return self._content_index.search(query)
+
+
+_mapping_indexes: TTLCache[int, MappingIndex] = TTLCache(
+    max_size=MAPPING_INDEX_CACHE_SIZE, ttl=INDEX_CACHE_TTL
+)
+
+
+def get_mapping_index(mapping: Dict[Any, str]) -> MappingIndex:
+    """Get cached index for mapping, index is shared by all users of mapping object.
+
+    Mapping shouldn't be changed in place after it's indexed, new dict gets new index.
+    """
+
+    index = _mapping_indexes.get(id(mapping))
+    if (
+        index is None
+        or index.mapping is not mapping
+        or len(index.values) != len(mapping)
+    ):
+        index = MappingIndex(mapping)
+        _mapping_indexes.set(id(mapping), index)
+
+    return index
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {
+        text[pos : pos + TRIGRAM_LEN] for pos in range(len(text) - TRIGRAM_LEN + 1)
+    }
+
+
+def _item_key(content_item: Any) -> Hashable:
+    # items which differ only by type or case are different content
+    if isinstance(content_item, set):
+        # order of set items differs between processes
+        return set, tuple(sorted(map(_item_key, content_item), key=str))
+    elif isinstance(content_item, (list, tuple)):
+        return type(content_item), tuple(map(_item_key, content_item))
+
+    return type(content_item), str(content_item)
+
+
+def _item_text(content_item: Any) -> str:
+    if isinstance(content_item, (list, tuple, set)):
+        return " ".join(sorted(map(_item_text, content_item)))
+
+    return str(content_item).casefold()
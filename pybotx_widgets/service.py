@@ -1,6 +1,8 @@
 """Widgets services."""
 
-from typing import Optional
+import asyncio
+from typing import Callable, List, Optional, Sequence, Tuple
+from uuid import UUID
 
 from botx import (
     Bot,
@@ -12,6 +14,143 @@ from botx import (
     UpdatePayload,
 )
 
+from pybotx_widgets.cache import TTLCache
+from pybotx_widgets.tracing import get_tracer
+
+CREDENTIALS_CACHE_SIZE = 4096
+CREDENTIALS_CACHE_TTL = 3600
+#: metadata key of messages of widgets which are displayed inside other widget
+NESTED_WIDGET_KEY = "pybotx_nested_widget"
+
+TransportFactory = Callable[[Bot], "Transport"]
+# message and flag whether it updates message with id from its credentials
+Operation = Tuple[SendingMessage, bool]
+
+#: credentials of updated messages by their ids, bot ids and hosts
+credentials_cache: TTLCache[Tuple[UUID, UUID, str], SendingCredentials] = TTLCache(
+    max_size=CREDENTIALS_CACHE_SIZE, ttl=CREDENTIALS_CACHE_TTL
+)
+
+
+class Transport:
+    """Sends and updates messages of widgets through botx API.
+
+    Every widget and `get_value` helper goes through transport of its bot,
+    credentials of updated messages are built once and reused.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+
+    async def send(self, message: SendingMessage) -> UUID:
+        """Send new message, it's sent with id from credentials if it's set."""
+
+        with get_tracer().span("bot.send") as span:
+            message_id = await self.bot.send(message)
+            span.set_tag("sent_message_id", message_id)
+            return message_id
+
+    async def update(
+        self,
+        message_id: UUID,
+        payload: UpdatePayload,
+        bot_id: UUID,
+        host: str,
+    ) -> UUID:
+        """Update sent message."""
+
+        with get_tracer().span("bot.update_message", message_id=message_id):
+            await self.bot.update_message(
+                get_credentials(message_id, bot_id, host), update=payload
+            )
+            return message_id
+
+    async def send_or_update(self, message: SendingMessage, update: bool) -> UUID:
+        """Update message with id from its credentials or send new one."""
+
+        credentials = message.credentials
+        if not update or credentials.message_id is None:
+            return await self.send(message)
+
+        return await self.update(
+            credentials.message_id,
+            UpdatePayload.from_sending_payload(message.payload),
+            credentials.bot_id,  # type: ignore
+            credentials.host,  # type: ignore
+        )
+
+    async def send_many(self, operations: Sequence[Operation]) -> List[UUID]:
+        """Send and update several messages in one dispatch.
+
+        New messages are sent one by one to keep their order in chat,
+        updates between them are sent concurrently.
+        """
+
+        message_ids: List[UUID] = []
+        updates: List[SendingMessage] = []
+        for message, update in operations:
+            if update and message.credentials.message_id is not None:
+                updates.append(message)
+                continue
+
+            message_ids += await self._update_many(updates)
+            updates = []
+            message_ids.append(await self.send(message))
+
+        message_ids += await self._update_many(updates)
+        return message_ids
+
+    async def _update_many(self, messages: List[SendingMessage]) -> List[UUID]:
+        if len(messages) == 1:
+            return [await self.send_or_update(messages[0], update=True)]
+
+        return list(
+            await asyncio.gather(
+                *(self.send_or_update(message, update=True) for message in messages)
+            )
+        )
+
+
+transport_factory: TransportFactory = Transport
+
+
+def get_transport(bot: Bot) -> Transport:
+    return transport_factory(bot)
+
+
+def set_transport_factory(factory: TransportFactory) -> None:
+    """Set factory of transports, e.g. to send messages of all widgets to fake."""
+
+    global transport_factory  # noqa: WPS420
+    transport_factory = factory
+
+
+def get_credentials(message_id: UUID, bot_id: UUID, host: str) -> SendingCredentials:
+    """Get cached credentials to update message."""
+
+    credentials_key = (message_id, bot_id, host)
+    credentials = credentials_cache.get(credentials_key)
+    if credentials is None:
+        credentials = SendingCredentials(sync_id=message_id, bot_id=bot_id, host=host)
+        credentials_cache.set(credentials_key, credentials)
+
+    return credentials
+
+
+def is_nested_widget_message(message: Message) -> bool:
+    """Check that message is built for widget displayed inside other widget."""
+
+    return bool(message.metadata.get(NESTED_WIDGET_KEY))
+
+
+def is_widget_message(message: Message) -> bool:
+    """Check that message is callback of widget message."""
+
+    return bool(
+        message.metadata.get("pybotx_widget")
+        or message.command.data.get("pybotx_widget")
+    )
+
 
 async def send_or_update_message(
     message: Message,
@@ -20,23 +159,34 @@ async def send_or_update_message(
     markup: MessageMarkup = None,
     msg_file: File = None,
 ) -> None:
-    """Send new message or update exist."""
+    """Send new message or update exist.
 
-    is_pybotx_widget = message.data.get("pybotx_widget")
+    Nothing is sent for nested widgets, their message is updated by parent widget.
+    """
 
-    markup = markup or MessageMarkup()
+    if is_nested_widget_message(message):
+        return
 
-    if is_pybotx_widget:
-        payload = UpdatePayload(text=text, file=msg_file)
-        payload.set_markup(markup=markup)
+    markup = markup or MessageMarkup()
+    transport = get_transport(bot)
 
-        await bot.update_message(
-            SendingCredentials(
-                sync_id=message.source_sync_id, bot_id=message.bot_id, host=message.host
-            ),
-            update=payload,
-        )
-    else:
-        message = SendingMessage.from_message(text=text, file=msg_file, message=message)
-        message.markup = markup
-        await bot.send(message)
+    with get_tracer().span(
+        "service.send_or_update_message",
+        trace_id=str(message.sync_id),
+        message_id=message.source_sync_id,
+    ):
+        if is_widget_message(message):
+            payload = UpdatePayload(text=text, file=msg_file)
+            payload.set_markup(markup=markup)
+            await transport.update(
+                message.source_sync_id,  # type: ignore
+                payload,
+                message.bot_id,
+                message.host,
+            )
+        else:
+            sending_message = SendingMessage.from_message(
+                text=text, file=msg_file, message=message
+            )
+            sending_message.markup = markup
+            await transport.send(sending_message)
@@ -0,0 +1,354 @@
+"""Asynchronous content sources for windowed widgets."""
+
+import asyncio
+from functools import partial
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    overload,
+)
+
+from loguru import logger
+
+from pybotx_widgets.cache import TTLCache
+
+PREFETCH_CACHE_SIZE = 32
+PREFETCH_CACHE_TTL = 60
+MAX_CURSORS = 32
+COUNT_KEY = "count"
+
+Window = Tuple[int, int]
+
+
+class ContentSource(Protocol):
+    """Source of widget content which is loaded window by window."""
+
+    async def count(self) -> int:
+        """Get count of all content items."""
+
+    async def fetch(self, offset: int, limit: int) -> Sequence[Any]:
+        """Get `limit` content items starting from `offset`."""
+
+
+class CursorSource(Protocol):
+    """Source of widget content which is read page by page, e.g. by keyset."""
+
+    async def count(self) -> int:
+        """Get count of all content items."""
+
+    async def fetch_after(
+        self, cursor: Optional[Any], limit: int
+    ) -> Tuple[Sequence[Any], Optional[Any]]:
+        """Get `limit` content items after cursor and cursor of the next items.
+
+        `None` cursor is start of content, `None` next cursor is end of content.
+        """
+
+
+class ContentWindow(Sequence[Any]):
+    """Sequence of known length where only loaded items are available."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self._items: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return self.total
+
+    @overload
+    def __getitem__(self, index: int) -> Any:
+        """Get item by index."""
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Any]:  # noqa: WPS440
+        """Get loaded items from slice."""
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:  # noqa: WPS440
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self.total))]
+
+        if index < 0:
+            index += self.total
+
+        try:
+            return self._items[index]
+        except KeyError:
+            raise IndexError(f"Content item {index} is not loaded")
+
+    def reset(self, total: int) -> None:
+        """Drop loaded items and set length of content."""
+
+        self.total = total
+        self._items.clear()
+
+    def load(self, offset: int, content_items: Sequence[Any]) -> None:
+        """Load content items starting from offset."""
+
+        for position, content_item in enumerate(content_items, offset):
+            self._items[position] = content_item
+
+
+class PrefetchStats:
+    """Statistics of `PrefetchingSource` cache usage."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.cancelled = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0
+
+
+class PrefetchingSource:
+    """Content source that caches windows and loads neighboring windows in advance.
+
+    Source is shared by widgets of all callbacks, e.g. it's created on module level.
+    Prefetches are requested by owners, e.g. chats of users, prefetch is cancelled
+    when it isn't requested by the latest `prefetch` call of any of its owners.
+    """
+
+    def __init__(
+        self,
+        source: ContentSource,
+        max_size: int = PREFETCH_CACHE_SIZE,
+        ttl: Optional[float] = PREFETCH_CACHE_TTL,
+    ) -> None:
+        """
+        :param source - Source of content
+        :param max_size - Max count of cached windows
+        :param ttl - Seconds after which cached window is fetched again
+        """
+        self.source = source
+        self.stats = PrefetchStats()
+        self._cache: TTLCache[Hashable, Any] = TTLCache(max_size=max_size, ttl=ttl)
+        self._prefetches: Dict[Window, asyncio.Task] = {}
+        # owners of running prefetches and running prefetches of owners
+        self._owners: Dict[Window, Set[Hashable]] = {}
+        self._owned: Dict[Hashable, Set[Window]] = {}
+
+    async def count(self) -> int:
+        content_count = self._cache.get(COUNT_KEY)
+        if content_count is None:
+            content_count = await self.source.count()
+            self._cache.set(COUNT_KEY, content_count)
+
+        return content_count
+
+    async def fetch(self, offset: int, limit: int) -> Sequence[Any]:
+        window = (offset, limit)
+
+        content_items = self._cache.get(window)
+        if content_items is not None:
+            self.stats.hits += 1
+            return content_items
+
+        prefetch = self._prefetches.get(window)
+        if prefetch is not None:
+            # awaited prefetch isn't cancelled by its owners anymore
+            self._forget(window)
+            self.stats.hits += 1
+            return await prefetch
+
+        self.stats.misses += 1
+        content_items = await self.source.fetch(offset, limit)
+        self._cache.set(window, content_items)
+        return content_items
+
+    def prefetch(self, windows: Iterable[Window], owner: Hashable = None) -> None:
+        """Start loading of windows and cancel stale prefetches of owner.
+
+        :param windows - Windows which will be displayed next
+        :param owner - Owner of prefetches, e.g. chat of widget,
+        prefetches of other owners aren't cancelled
+        """
+
+        windows = {window for window in windows if window[1] > 0}
+
+        for window in self._owned.get(owner, set()) - windows:
+            self._disown(window, owner)
+
+        for window in windows:
+            if window in self._cache:
+                continue
+
+            if window not in self._prefetches:
+                prefetch = asyncio.ensure_future(self._prefetch(window))
+                prefetch.add_done_callback(partial(self._on_prefetched, window))
+                self._prefetches[window] = prefetch
+
+            self._owners.setdefault(window, set()).add(owner)
+            self._owned.setdefault(owner, set()).add(window)
+
+    async def _prefetch(self, window: Window) -> Sequence[Any]:
+        content_items = await self.source.fetch(*window)
+        self._cache.set(window, content_items)
+        self.stats.prefetched += 1
+        return content_items
+
+    def _on_prefetched(self, window: Window, prefetch: asyncio.Task) -> None:
+        if self._prefetches.get(window) is prefetch:
+            self._forget(window)
+
+        # exception is retrieved, so failed prefetch isn't logged by event loop
+        if not prefetch.cancelled() and prefetch.exception() is not None:
+            logger.debug(f"Prefetch of {window} failed: {prefetch.exception()!r}")
+
+    def _disown(self, window: Window, owner: Hashable) -> None:
+        owners = self._owners.get(window, set())
+        owners.discard(owner)
+        self._discard_owned(owner, window)
+        if owners:
+            return
+
+        prefetch = self._prefetches.get(window)
+        self._forget(window)
+        if prefetch is not None and prefetch.cancel():
+            self.stats.cancelled += 1
+
+    def _forget(self, window: Window) -> None:
+        self._prefetches.pop(window, None)
+        for owner in self._owners.pop(window, ()):
+            self._discard_owned(owner, window)
+
+    def _discard_owned(self, owner: Hashable, window: Window) -> None:
+        owned = self._owned.get(owner)
+        if owned is not None:
+            owned.discard(window)
+            if not owned:
+                del self._owned[owner]  # noqa: WPS420
+
+
+class CursorIndex:
+    """Sparse index of cursors by offsets of content.
+
+    When index grows over `max_size`, every second cursor is dropped except
+    the furthest one, so any offset is reached by a few fetches from a known one.
+    """
+
+    def __init__(
+        self, cursors: Iterable[Tuple[int, Any]] = (), max_size: int = MAX_CURSORS
+    ) -> None:
+        """
+        :param cursors - Pairs of offset and cursor of item at this offset
+        :param max_size - Max count of kept cursors
+        """
+        if max_size < 2:
+            raise ValueError("'max_size' should be greater than 1")
+
+        self.max_size = max_size
+        self.cursors: Dict[int, Any] = {}
+        self.load(cursors)
+
+    def load(self, cursors: Iterable[Tuple[int, Any]]) -> None:
+        for offset, cursor in cursors:
+            self.add(offset, cursor)
+
+    def dump(self) -> List[Tuple[int, Any]]:
+        """Get pairs of offset and cursor ordered by offset."""
+
+        return sorted(self.cursors.items())
+
+    def add(self, offset: int, cursor: Any) -> None:
+        if offset <= 0 or cursor is None:
+            return
+
+        self.cursors[offset] = cursor
+        if len(self.cursors) > self.max_size:
+            offsets = sorted(self.cursors)
+            for dropped_offset in offsets[-2::-2]:
+                del self.cursors[dropped_offset]  # noqa: WPS420
+
+    def nearest(self, offset: int) -> Tuple[int, Optional[Any]]:
+        """Get known offset which isn't greater than given one and its cursor."""
+
+        known_offset = max(
+            (indexed for indexed in self.cursors if indexed <= offset), default=0
+        )
+        return known_offset, self.cursors.get(known_offset)
+
+
+class CursorIndexSource:
+    """Content source with offsets over source with cursors.
+
+    Offset is read from the nearest indexed cursor, cursors of read pages are
+    added to index, so widget with the index in its state reaches any page fast.
+    """
+
+    def __init__(self, source: CursorSource, index: CursorIndex) -> None:
+        self.source = source
+        self.index = index
+
+    async def count(self) -> int:
+        return await self.source.count()
+
+    async def fetch(self, offset: int, limit: int) -> Sequence[Any]:
+        position, cursor = self.index.nearest(offset)
+        while position < offset:
+            # pages are walked by `limit`, so their cursors are at page offsets
+            skipped_items, cursor = await self.source.fetch_after(
+                cursor, min(limit, offset - position)
+            )
+            position += len(skipped_items)
+            if not skipped_items or cursor is None:
+                return []
+
+            self.index.add(position, cursor)
+
+        content_items, next_cursor = await self.source.fetch_after(cursor, limit)
+        self.index.add(offset + len(content_items), next_cursor)
+        return content_items
+
+
+def window_ranges(
+    offset: int, limit: int, total: int, loop: bool = False
+) -> List[Window]:
+    """Split window into ranges of content, looped window can wrap to the start."""
+
+    if total <= 0 or limit <= 0:
+        return []
+
+    if not loop:
+        offset = max(offset, 0)
+        return [(offset, min(limit, total - offset))] if offset < total else []
+
+    if limit >= total:
+        return [(0, total)]
+
+    offset %= total
+    head_limit = min(limit, total - offset)
+    ranges = [(offset, head_limit)]
+    if head_limit < limit:
+        ranges.append((0, limit - head_limit))
+
+    return ranges
+
+
+async def load_window(
+    source: ContentSource, window: ContentWindow, ranges: Iterable[Window]
+) -> None:
+    """Load ranges of content from source into window."""
+
+    for offset, limit in ranges:
+        window.load(offset, await source.fetch(offset, limit))
+
+
+def prefetch_neighbors(
+    source: ContentSource, ranges: Iterable[Window], owner: Hashable = None
+) -> None:
+    """Start prefetching of ranges if source supports it."""
+
+    if isinstance(source, PrefetchingSource):
+        source.prefetch(ranges, owner)
@@ -0,0 +1,528 @@
+"""Compact encoding of widget state in bubbles data and message metadata."""
+
+import base64
+import re
+import struct
+import zlib
+from datetime import date
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from uuid import UUID
+
+from botx import Message
+
+from pybotx_widgets.cache import TTLCache
+
+#: key of encoded state, first char of its value is version of codec
+ENCODED_STATE_KEY = "~"
+
+#: state keys which are sent as their indexes in this table, it's append-only,
+#: because messages sent with old table can be still in chats
+STATE_KEYS = (
+    "carousel_start_from",
+    "carousel_selected_val",
+    "carousel_selected_value_label",
+    "carousel_message_label",
+    "carousel_search_query",
+    "calendar_month_to_display",
+    "calendar_selected_date",
+    "calendar_screen",
+    "calendar_range_start",
+    "checklist_selected_item",
+    "checklist_checked_items",
+    "pagination_start_from",
+    "pagination_message_ids",
+    "payload_page_ids",
+    "dashboard_child",
+    "dashboard_state",
+    "pagination_page_cursors",
+    "checktable_picker_start_from",
+    "checktable_picker_query",
+    "checktable_picker_value",
+)
+
+CONTENT_INDEXES_CACHE_SIZE = 64
+CONTENT_INDEXES_CACHE_TTL = 600
+
+#: states with this count of scalar values are cached after encoding
+SMALL_STATE_SIZE = 2
+ENCODED_STATES_CACHE_SIZE = 4096
+
+COMPRESSED_FLAG = 1
+COMPRESS_MIN_SIZE = 128
+
+# tags of encoded values
+NONE_TAG = 0
+FALSE_TAG = 1
+TRUE_TAG = 2
+INT_TAG = 3
+STR_TAG = 4
+DATE_TAG = 5
+LIST_TAG = 6
+DICT_TAG = 7
+REF_TAG = 8
+UUID_TAG = 9
+FLOAT_TAG = 10
+
+SCALAR_TYPES = frozenset((str, int, float, bool))
+
+EPOCH = date(2000, 1, 1)
+ISO_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+
+
+class ContentRef:
+    """Index of content item which isn't resolved yet."""
+
+    __slots__ = ("index", "checksum")
+
+    def __init__(self, index: int, checksum: int) -> None:
+        self.index = index
+        self.checksum = checksum
+
+    def resolve(self, content: Sequence[Any]) -> Any:
+        """Get content item, raise `LookupError` if content has been changed."""
+
+        if self.index >= len(content):
+            raise LookupError("Referenced content item is removed")
+
+        content_item = content[self.index]
+        if _checksum(content_item) != self.checksum:
+            raise LookupError("Referenced content item is changed")
+
+        return content_item
+
+
+class StateCodec:
+    """Encoder of widget state into JSON-compatible value.
+
+    Encoded state is kept in `ENCODED_STATE_KEY`, keys which aren't encoded
+    are kept as is, so custom data of bubbles is available to handlers.
+    """
+
+    #: one char which is written before encoded state
+    version: str
+
+    def encode(
+        self,
+        state: Dict[str, Any],
+        content: Optional[Sequence[Any]] = None,
+        ref_keys: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        """Encode state.
+
+        :param state - State of widget
+        :param content - Content of widget which items can be sent as indexes
+        :param ref_keys - Keys which values are content items
+        """
+        raise NotImplementedError
+
+    def decode(self, encoded_state: str) -> Dict[str, Any]:
+        """Decode state without version char, content items are `ContentRef`."""
+
+        raise NotImplementedError
+
+
+class CompactCodec(StateCodec):
+    """Binary state encoding packed into base64 string.
+
+    Known keys are replaced with their indexes in `STATE_KEYS`, ints are packed
+    as varints, dates and UUID strings take 3 and 16 bytes, content items
+    are sent as their indexes. Big state is compressed with zlib.
+    """
+
+    version = "1"
+
+    def __init__(self, compress_min_size: Optional[int] = COMPRESS_MIN_SIZE) -> None:
+        """
+        :param compress_min_size - Min size of state which is compressed,
+        `None` - don't compress
+        """
+        self.compress_min_size = compress_min_size
+        self._key_indexes = {key: index for index, key in enumerate(STATE_KEYS)}
+        self._encoded_states: Dict[Hashable, Optional[Dict[str, Any]]] = {}
+
+    def encode(
+        self,
+        state: Dict[str, Any],
+        content: Optional[Sequence[Any]] = None,
+        ref_keys: Iterable[str] = (),
+    ) -> Dict[str, Any]:
+        if ENCODED_STATE_KEY in state:
+            return state
+
+        ref_keys = frozenset(ref_keys) if content is not None else frozenset()
+        content_indexes: Optional[Dict[Hashable, int]] = None
+        if ref_keys & state.keys():
+            content_indexes = _index_content(content)  # type: ignore
+
+        # data of bubbles is small and repeated in every render, so it's cached
+        cache_key = None
+        if content_indexes is None and len(state) <= SMALL_STATE_SIZE:
+            cache_key = _scalar_items(state)
+
+        if cache_key is not None and cache_key in self._encoded_states:
+            encoded_state = self._encoded_states[cache_key]
+            return state if encoded_state is None else {**encoded_state}
+
+        plain_state = self._encode(state, content_indexes, ref_keys)
+        if cache_key is not None:
+            if len(self._encoded_states) >= ENCODED_STATES_CACHE_SIZE:
+                self._encoded_states.clear()
+            # `None` means that state is sent as is
+            self._encoded_states[cache_key] = (
+                None if plain_state is state else {**plain_state}
+            )
+
+        return plain_state
+
+    def _encode(
+        self,
+        state: Dict[str, Any],
+        content_indexes: Optional[Dict[Hashable, int]],
+        ref_keys: FrozenSet[str],
+    ) -> Dict[str, Any]:
+        plain_state: Dict[str, Any] = {}
+        encoded_items: List[bytes] = []
+        for key, state_value in state.items():
+            if key not in self._key_indexes:
+                plain_state[key] = state_value
+                continue
+
+            encoded_value = bytearray()
+            try:
+                self._write_value(
+                    encoded_value,
+                    state_value,
+                    content_indexes if key in ref_keys else None,
+                )
+            except TypeError:
+                plain_state[key] = state_value
+                continue
+
+            encoded_items.append(_varint(self._key_indexes[key] * 2) + encoded_value)
+
+        if not encoded_items:
+            return state
+
+        body = _varint(len(encoded_items)) + b"".join(encoded_items)
+        flags = 0
+        if self.compress_min_size is not None and len(body) >= self.compress_min_size:
+            compressed_body = zlib.compress(body, 9)
+            if len(compressed_body) < len(body):
+                body = compressed_body
+                flags |= COMPRESSED_FLAG
+
+        encoded_state = base64.urlsafe_b64encode(bytes([flags]) + body).rstrip(b"=")
+        plain_state[ENCODED_STATE_KEY] = self.version + encoded_state.decode()
+        return plain_state
+
+    def decode(self, encoded_state: str) -> Dict[str, Any]:
+        padding = "=" * (-len(encoded_state) % 4)
+        raw_state = base64.urlsafe_b64decode(encoded_state + padding)
+
+        body = raw_state[1:]
+        if raw_state[0] & COMPRESSED_FLAG:
+            body = zlib.decompress(body)
+
+        reader = _Reader(body)
+        return self._read_dict(reader)
+
+    def _write_value(  # noqa: C901, WPS231
+        self,
+        encoded: bytearray,
+        state_value: Any,
+        content_indexes: Optional[Dict[Hashable, int]],
+    ) -> None:
+        if content_indexes is not None and not isinstance(state_value, list):
+            content_index = _find(content_indexes, state_value)
+            if content_index is not None:
+                state_value = ContentRef(content_index, _checksum(state_value))
+
+        if isinstance(state_value, ContentRef):
+            encoded.append(REF_TAG)
+            encoded += _varint(state_value.index)
+            encoded += struct.pack(">H", state_value.checksum)
+        elif state_value is None:
+            encoded.append(NONE_TAG)
+        elif isinstance(state_value, bool):
+            encoded.append(TRUE_TAG if state_value else FALSE_TAG)
+        elif isinstance(state_value, int):
+            encoded.append(INT_TAG)
+            encoded += _varint(_zigzag(state_value))
+        elif isinstance(state_value, float):
+            encoded.append(FLOAT_TAG)
+            encoded += struct.pack(">d", state_value)
+        elif type(state_value) is date or _is_iso_date(state_value):  # noqa: WPS516
+            encoded.append(DATE_TAG)
+            encoded += _varint(_zigzag((_as_date(state_value) - EPOCH).days))
+        elif isinstance(state_value, UUID) or _is_uuid(state_value):
+            encoded.append(UUID_TAG)
+            encoded += UUID(str(state_value)).bytes
+        elif isinstance(state_value, str):
+            encoded_str = state_value.encode()
+            encoded.append(STR_TAG)
+            encoded += _varint(len(encoded_str)) + encoded_str
+        elif isinstance(state_value, (list, tuple)):
+            encoded.append(LIST_TAG)
+            encoded += _varint(len(state_value))
+            for list_item in state_value:
+                self._write_value(encoded, list_item, content_indexes)
+        elif isinstance(state_value, dict):
+            encoded.append(DICT_TAG)
+            encoded += _varint(len(state_value))
+            for key, dict_value in state_value.items():
+                self._write_key(encoded, key)
+                self._write_value(encoded, dict_value, None)
+        else:
+            raise TypeError(f"Unsupported state value {state_value!r}")
+
+    def _write_key(self, encoded: bytearray, key: str) -> None:
+        key_index = self._key_indexes.get(key)
+        if key_index is not None:
+            encoded += _varint(key_index * 2)
+            return
+
+        if not isinstance(key, str):
+            raise TypeError(f"Unsupported state key {key!r}")
+
+        encoded_key = key.encode()
+        encoded += _varint(len(encoded_key) * 2 + 1) + encoded_key
+
+    def _read_key(self, reader: "_Reader") -> str:
+        key_code = reader.varint()
+        if key_code % 2 == 0:
+            return STATE_KEYS[key_code // 2]
+
+        return reader.read(key_code // 2).decode()
+
+    def _read_dict(self, reader: "_Reader") -> Dict[str, Any]:
+        return {
+            self._read_key(reader): self._read_value(reader)
+            for _ in range(reader.varint())
+        }
+
+    def _read_value(self, reader: "_Reader") -> Any:  # noqa: C901, WPS212
+        tag = reader.read(1)[0]
+
+        if tag == NONE_TAG:
+            return None
+        elif tag in {FALSE_TAG, TRUE_TAG}:
+            return tag == TRUE_TAG
+        elif tag == INT_TAG:
+            return _unzigzag(reader.varint())
+        elif tag == FLOAT_TAG:
+            return struct.unpack(">d", reader.read(8))[0]
+        elif tag == DATE_TAG:
+            return date.fromordinal(
+                EPOCH.toordinal() + _unzigzag(reader.varint())
+            ).isoformat()
+        elif tag == UUID_TAG:
+            return str(UUID(bytes=reader.read(16)))
+        elif tag == STR_TAG:
+            return reader.read(reader.varint()).decode()
+        elif tag == LIST_TAG:
+            return [self._read_value(reader) for _ in range(reader.varint())]
+        elif tag == DICT_TAG:
+            return self._read_dict(reader)
+        elif tag == REF_TAG:
+            index = reader.varint()
+            return ContentRef(index, struct.unpack(">H", reader.read(2))[0])
+
+        raise ValueError(f"Unknown state value tag {tag}")
+
+
+class _Reader:
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.position = 0
+
+    def read(self, size: int) -> bytes:
+        chunk = self.body[self.position : self.position + size]
+        if len(chunk) != size:
+            raise ValueError("Encoded state is truncated")
+
+        self.position += size
+        return chunk
+
+    def varint(self) -> int:
+        varint_value = 0
+        shift = 0
+        while True:  # noqa: WPS457
+            byte = self.read(1)[0]
+            varint_value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return varint_value
+            shift += 7
+
+
+_content_indexes: TTLCache[int, Tuple[Sequence[Any], Dict[Hashable, int]]] = TTLCache(
+    max_size=CONTENT_INDEXES_CACHE_SIZE, ttl=CONTENT_INDEXES_CACHE_TTL
+)
+
+#: codecs by their versions, all of them are used to decode received messages
+codecs: Dict[str, StateCodec] = {CompactCodec.version: CompactCodec()}
+
+
+def register_codec(codec: StateCodec) -> None:
+    """Register codec to decode states encoded by it."""
+
+    codecs[codec.version] = codec
+
+
+def decode_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode state if it's encoded, state without encoded part is returned as is."""
+
+    encoded_state = state.get(ENCODED_STATE_KEY)
+    if not isinstance(encoded_state, str) or not encoded_state:
+        return state
+
+    codec = codecs.get(encoded_state[0])
+    if codec is None:
+        raise ValueError(f"Unknown version '{encoded_state[0]}' of widget state")
+
+    decoded_state = {
+        key: state_value
+        for key, state_value in state.items()
+        if key != ENCODED_STATE_KEY
+    }
+    decoded_state.update(codec.decode(encoded_state[1:]))
+    return decoded_state
+
+
+def decode_message(message: Message, content: Optional[Sequence[Any]] = None) -> None:
+    """Decode state in data and metadata of message in place.
+
+    :param content - Content of widget to resolve its items sent as indexes
+    """
+
+    for state in (message.command.data, message.metadata):
+        if isinstance(state, dict) and ENCODED_STATE_KEY in state:
+            decoded_state = decode_state(state)
+            state.clear()
+            state.update(decoded_state)
+
+        if content is not None:
+            resolve_refs(state, content)
+
+
+def resolve_refs(state: Dict[str, Any], content: Sequence[Any]) -> None:
+    """Replace content indexes with content items in place.
+
+    Values which refer to removed or changed content items are dropped.
+    """
+
+    for key, state_value in list(state.items()):
+        if isinstance(state_value, ContentRef):
+            try:
+                state[key] = state_value.resolve(content)
+            except LookupError:
+                del state[key]  # noqa: WPS420
+        elif isinstance(state_value, list) and any(
+            isinstance(list_item, ContentRef) for list_item in state_value
+        ):
+            state[key] = _resolve_list(state_value, content)
+
+
+def _resolve_list(state_value: List[Any], content: Sequence[Any]) -> List[Any]:
+    resolved = []
+    for list_item in state_value:
+        if isinstance(list_item, ContentRef):
+            try:
+                list_item = list_item.resolve(content)
+            except LookupError:
+                continue
+        resolved.append(list_item)
+
+    return resolved
+
+
+def _scalar_items(state: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    scalar_items = []
+    for key, state_value in state.items():
+        if state_value is not None and type(state_value) not in SCALAR_TYPES:
+            return None
+        # type is a part of key, because `1 == 1.0 == True`
+        scalar_items.append((key, type(state_value), state_value))
+
+    return tuple(scalar_items)
+
+
+def _index_content(content: Sequence[Any]) -> Dict[Hashable, int]:
+    # content is kept in cache, so its id isn't reused while index is cached
+    cached_index = _content_indexes.get(id(content))
+    if cached_index is not None and cached_index[0] is content:
+        return cached_index[1]
+
+    content_indexes: Dict[Hashable, int] = {}
+    for index, content_item in enumerate(content):
+        try:
+            content_indexes.setdefault(content_item, index)
+        except TypeError:
+            continue
+
+    _content_indexes.set(id(content), (content, content_indexes))
+    return content_indexes
+
+
+def _find(content_indexes: Dict[Hashable, int], state_value: Any) -> Optional[int]:
+    try:
+        return content_indexes.get(state_value)
+    except TypeError:
+        return None
+
+
+def _checksum(content_item: Any) -> int:
+    return zlib.crc32(str(content_item).encode()) & 0xFFFF
+
+
+def _varint(number: int) -> bytes:
+    encoded = bytearray()
+    while number >= 0x80:
+        encoded.append((number & 0x7F) | 0x80)
+        number >>= 7
+    encoded.append(number)
+    return bytes(encoded)
+
+
+def _zigzag(number: int) -> int:
+    return number * 2 if number >= 0 else -number * 2 - 1
+
+
+def _unzigzag(number: int) -> int:
+    return number // 2 if number % 2 == 0 else -(number + 1) // 2
+
+
+def _is_iso_date(state_value: Any) -> bool:
+    if not isinstance(state_value, str) or not ISO_DATE_PATTERN.fullmatch(state_value):
+        return False
+
+    try:
+        date.fromisoformat(state_value)
+    except ValueError:
+        return False
+
+    return True
+
+
+def _as_date(state_value: Any) -> date:
+    return (
+        state_value
+        if isinstance(state_value, date)
+        else date.fromisoformat(state_value)
+    )
+
+
+def _is_uuid(state_value: Any) -> bool:
+    return isinstance(state_value, str) and bool(UUID_PATTERN.fullmatch(state_value))
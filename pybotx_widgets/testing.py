@@ -0,0 +1,320 @@
+"""In-memory fake of botx API for widgets testing and load tests."""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import httpx
+from botx import (
+    Bot,
+    BotXCredentials,
+    BubbleElement,
+    Message,
+    SendingCredentials,
+    SendingMessage,
+    UpdatePayload,
+)
+
+from pybotx_widgets.service import Transport
+
+FAKE_BOT_ID = UUID("8dada2c8-67a6-4434-9dec-570d244e78ee")
+FAKE_HOST = "cts.example.com"
+FAKE_SECRET_KEY = "secret"
+FAKE_TOKEN = "token"
+
+TOKEN_URL = f"/api/v2/botx/bots/{FAKE_BOT_ID}/token"
+COMMAND_RESULT_URL = "/api/v3/botx/command/callback"
+DIRECT_NOTIFICATION_URL = "/api/v3/botx/notification/callback/direct"
+EDIT_EVENT_URL = "/api/v3/botx/events/edit_event"
+
+
+class SentMessage:
+    """Message as it is stored by botx API after JSON serialization."""
+
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.text: Optional[str] = payload.get("text")
+        self.metadata: Dict[str, Any] = payload.get("metadata") or {}
+        markup = payload.get("markup") or payload
+        self.bubbles: List[List[BubbleElement]] = [
+            [BubbleElement(**bubble) for bubble in row]
+            for row in markup.get("bubbles") or []
+        ]
+
+    @classmethod
+    def from_api(
+        cls, payload: Dict[str, Any], sent: Optional["SentMessage"] = None
+    ) -> "SentMessage":
+        """Build message from payload of botx API request.
+
+        :param payload - Result payload of request, e.g. `notification`
+        :param sent - Updated message, fields which are missing in payload are kept
+        """
+
+        sent_message = cls({})
+        sent_message.text = payload.get("body", sent.text if sent else None)
+        sent_message.metadata = payload.get("metadata", sent.metadata if sent else {})
+        if "bubble" in payload:
+            sent_message.bubbles = [
+                [BubbleElement(**bubble) for bubble in row] for row in payload["bubble"]
+            ]
+        elif sent is not None:
+            sent_message.bubbles = sent.bubbles
+
+        return sent_message
+
+    def find_bubble(self, label: str) -> BubbleElement:
+        """Find bubble by its label."""
+
+        for row in self.bubbles:
+            for bubble in row:
+                if bubble.label == label:
+                    return bubble
+
+        raise LookupError(f"Bubble '{label}' is not found")
+
+
+class FakeBot:
+    """Fake botx API which keeps sent messages in memory.
+
+    Every API call takes `latency` seconds, calls over `rate_limit` per second
+    wait for their turn like throttled requests.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0,
+        rate_limit: Optional[float] = None,
+        keep_messages: bool = True,
+    ) -> None:
+        """
+        :param latency - Seconds which every API call takes
+        :param rate_limit - Max count of API calls per second, `None` - unlimited
+        :param keep_messages - Keep sent messages, so callbacks can be built from them
+        """
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.keep_messages = keep_messages
+
+        self.messages: Dict[UUID, SentMessage] = {}
+        self.sent_count = 0
+        self.updated_count = 0
+        self.throttled_count = 0
+        self._next_call_at = 0.0
+
+    async def send(self, message: SendingMessage, *, update: bool = False) -> UUID:
+        await self._call_api()
+
+        message_id = message.credentials.message_id
+        if update and message_id is not None:
+            self.updated_count += 1
+        else:
+            # like botx, message is sent with id from credentials if it's set
+            message_id = message_id or uuid.uuid4()
+            self.sent_count += 1
+
+        self._store(message_id, message.payload.json())
+        return message_id
+
+    async def update_message(
+        self, credentials: SendingCredentials, update: UpdatePayload
+    ) -> None:
+        await self._call_api()
+
+        self.updated_count += 1
+        if credentials.sync_id is not None:
+            self._store(credentials.sync_id, update.json())
+
+    def build_message(  # noqa: WPS211
+        self,
+        body: str,
+        data: Dict[str, Any] = None,
+        metadata: Dict[str, Any] = None,
+        source_sync_id: UUID = None,
+        user: Dict[str, Any] = None,
+    ) -> Message:
+        """Build incoming message like it is parsed from botx request."""
+
+        return Message.from_dict(
+            {
+                "sync_id": uuid.uuid4(),
+                "command": {
+                    "body": body,
+                    "command_type": "user",
+                    "data": data or {},
+                    "metadata": metadata or {},
+                },
+                "source_sync_id": source_sync_id,
+                "bot_id": FAKE_BOT_ID,
+                "from": user or build_user(),
+            },
+            self.message_bot,
+        )
+
+    @property
+    def message_bot(self) -> Any:
+        """Bot which incoming messages are bound to and widgets are created with."""
+
+        return self
+
+    def click(
+        self, message_id: UUID, bubble: BubbleElement, user: Dict[str, Any] = None
+    ) -> Message:
+        """Build callback message of bubble from sent message."""
+
+        sent_message = self.messages[message_id]
+        return self.build_message(
+            bubble.command,
+            data=bubble.data,
+            metadata=sent_message.metadata,
+            source_sync_id=message_id,
+            user=user,
+        )
+
+    async def _call_api(self) -> None:
+        if self.rate_limit:
+            now = time.monotonic()
+            call_at = max(now, self._next_call_at)
+            self._next_call_at = call_at + 1 / self.rate_limit
+            if call_at > now:
+                self.throttled_count += 1
+                await asyncio.sleep(call_at - now)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _store(self, message_id: UUID, payload: str) -> None:
+        if self.keep_messages:
+            self.messages[message_id] = SentMessage(json.loads(payload))
+
+
+class FakeBotxAPI(FakeBot):
+    """Fake botx API which is served over HTTP for real `Bot`.
+
+    Requests of `bot` go through botx client, JSON serialization and `httpx`
+    to the fake, only network is replaced by `httpx.MockTransport`.
+    Token, command result, direct notification and edit event methods are served.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0,
+        rate_limit: Optional[float] = None,
+        keep_messages: bool = True,
+    ) -> None:
+        super().__init__(latency, rate_limit, keep_messages)
+
+        self.bot = Bot(
+            bot_accounts=[
+                BotXCredentials(
+                    host=FAKE_HOST, secret_key=FAKE_SECRET_KEY, bot_id=FAKE_BOT_ID
+                )
+            ]
+        )
+        self.bot.client.http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(self.handle_request)
+        )
+
+    @property
+    def message_bot(self) -> Any:
+        return self.bot
+
+    async def authorize(self) -> Bot:
+        """Get token of bot from fake, it's required before the first request."""
+
+        await self.bot.authorize()
+        return self.bot
+
+    async def close(self) -> None:
+        await self.bot.client.http_client.aclose()
+
+    async def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Handle request of botx client like botx API does."""
+
+        if request.url.path == TOKEN_URL:
+            return _api_response(FAKE_TOKEN)
+
+        if request.headers.get("Authorization") != f"Bearer {FAKE_TOKEN}":
+            return httpx.Response(
+                401, json={"status": "error", "reason": "unauthorized"}
+            )
+
+        await self._call_api()
+        payload = json.loads(request.content)
+
+        if request.url.path == EDIT_EVENT_URL:
+            message_id = UUID(payload["sync_id"])
+            self.updated_count += 1
+            self._store_api(message_id, payload["payload"])
+            return _api_response("update_pushed")
+
+        if request.url.path in {COMMAND_RESULT_URL, DIRECT_NOTIFICATION_URL}:
+            # like botx, message is sent with id from request if it's set
+            event_sync_id = payload.get("event_sync_id")
+            message_id = UUID(event_sync_id) if event_sync_id else uuid.uuid4()
+            self.sent_count += 1
+            self._store_api(
+                message_id,
+                payload.get("notification") or payload["command_result"],
+                update=False,
+            )
+            return _api_response({"sync_id": str(message_id)})
+
+        return httpx.Response(404, json={"status": "error", "reason": "not_found"})
+
+    def _store_api(
+        self, message_id: UUID, payload: Dict[str, Any], update: bool = True
+    ) -> None:
+        if self.keep_messages:
+            sent = self.messages.get(message_id) if update else None
+            self.messages[message_id] = SentMessage.from_api(payload, sent)
+
+
+class InMemoryTransport(Transport):
+    """Transport which keeps messages of widgets instead of sending them.
+
+    It's set for all widgets by `set_transport_factory(lambda bot: transport)`.
+    """
+
+    def __init__(self, bot: Any = None) -> None:
+        super().__init__(bot)
+        self.messages: Dict[UUID, SentMessage] = {}
+        self.sent_count = 0
+        self.updated_count = 0
+
+    async def send(self, message: SendingMessage) -> UUID:
+        message_id = message.credentials.message_id or uuid.uuid4()
+        self.sent_count += 1
+        self.messages[message_id] = SentMessage(json.loads(message.payload.json()))
+        return message_id
+
+    async def update(
+        self, message_id: UUID, payload: UpdatePayload, bot_id: UUID, host: str
+    ) -> UUID:
+        self.updated_count += 1
+        self.messages[message_id] = SentMessage(json.loads(payload.json()))
+        return message_id
+
+
+def build_user(
+    user_huid: UUID = None, group_chat_id: UUID = None, host: str = FAKE_HOST
+) -> Dict[str, Any]:
+    """Build sender of incoming message."""
+
+    return {
+        "user_huid": user_huid or uuid.uuid4(),
+        "group_chat_id": group_chat_id or uuid.uuid4(),
+        "chat_type": "chat",
+        "ad_login": None,
+        "ad_domain": None,
+        "username": None,
+        "is_admin": False,
+        "is_creator": False,
+        "host": host,
+    }
+
+
+def _api_response(api_result: Any) -> httpx.Response:
+    return httpx.Response(200, json={"status": "ok", "result": api_result})
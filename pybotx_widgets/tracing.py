@@ -0,0 +1,190 @@
+"""Tracing spans of widget requests."""
+
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    ContextManager,
+    DefaultDict,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+from uuid import uuid4
+
+#: span which is active in current task, new spans become its children
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "pybotx_widgets_span", default=None
+)
+
+
+class Span:
+    """Timed operation of widget request."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "tags",
+        "started_at",
+        "duration",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        tags: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid4().hex
+        self.parent_id = parent_id
+        self.tags: Dict[str, Any] = tags or {}
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+
+    def set_tag(self, key: str, tag_value: Any) -> None:
+        self.tags[key] = tag_value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "tags": self.tags,
+            "started_at": self.started_at,
+            "duration": self.duration,
+        }
+
+
+class NoopSpan(Span):
+    """Span which isn't recorded, it's its own context manager."""
+
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        super().__init__("noop", "")
+
+    def __enter__(self) -> Span:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Nothing is recorded."""
+
+    def set_tag(self, key: str, tag_value: Any) -> None:
+        """Tags of span aren't kept."""
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer:
+    """Tracer which doesn't record spans, it's used by default."""
+
+    #: spans are recorded, so their tags should be collected
+    enabled = False
+
+    def span(
+        self, name: str, trace_id: Optional[str] = None, **tags: Any
+    ) -> ContextManager[Span]:
+        """Trace operation in `with` block.
+
+        :param name - Name of operation
+        :param trace_id - Id of trace if span has no parent, e.g. id of message
+        :param tags - Tags of span, e.g. widget class and message id
+        """
+        return NOOP_SPAN
+
+
+class RecordingTracer(Tracer):
+    """Tracer which passes every finished span to `export`.
+
+    Spans opened inside other span in the same task are its children,
+    so callback handling, render and every request to botx API are one trace.
+    """
+
+    enabled = True
+
+    def span(
+        self, name: str, trace_id: Optional[str] = None, **tags: Any
+    ) -> ContextManager[Span]:
+        return self._record(name, trace_id, tags)
+
+    @contextmanager
+    def _record(
+        self, name: str, trace_id: Optional[str], tags: Dict[str, Any]
+    ) -> Iterator[Span]:
+        parent = _current_span.get()
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, tags)
+        else:
+            span = Span(name, trace_id or uuid4().hex, tags=tags)
+
+        started_at = time.perf_counter()
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.set_tag("error", repr(exc))
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - started_at
+            self.export(span)
+
+    def export(self, span: Span) -> None:
+        """Send finished span to tracing backend."""
+
+        raise NotImplementedError
+
+
+class InMemoryTracer(RecordingTracer):
+    """Tracer which keeps finished spans in memory, e.g. for tests."""
+
+    def __init__(self, max_spans: Optional[int] = None) -> None:
+        """
+        :param max_spans - Max count of kept spans, oldest are dropped
+        """
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def traces(self) -> Dict[str, List[Span]]:
+        """Get finished spans grouped by trace id in order of their start."""
+
+        traces: DefaultDict[str, List[Span]] = defaultdict(list)
+        for span in sorted(self.spans, key=lambda finished: finished.started_at):
+            traces[span.trace_id].append(span)
+
+        return dict(traces)
+
+    def find(self, name: str) -> List[Span]:
+        """Get finished spans by name."""
+
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+tracer: Tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return tracer
+
+
+def set_tracer(new_tracer: Tracer) -> None:
+    """Set tracer of all widgets."""
+
+    global tracer  # noqa: WPS420
+    tracer = new_tracer
@@ -0,0 +1,85 @@
+"""Warm start of widget resources before the first request."""
+
+import os
+import time
+from datetime import date
+from typing import Optional
+
+from botx import BubbleElement
+from dateutil.relativedelta import relativedelta
+from loguru import logger
+
+from pybotx_widgets.calendar import CalendarWidget, get_month_weeks, get_weekdays_row
+from pybotx_widgets.checktable import CheckboxContent
+from pybotx_widgets.locales import locales
+from pybotx_widgets.resources import strings
+
+DEFAULT_HORIZON = 12
+
+
+def warmup(horizon: int = DEFAULT_HORIZON, start: Optional[date] = None) -> float:
+    """Precompile templates and fill caches, so worker is ready for traffic.
+
+    :param horizon - Count of months from `start` which grids are cached
+    :param start - First month of horizon, current month by default
+    :return - Seconds which warmup took
+    """
+
+    started_at = time.perf_counter()
+
+    warmup_templates()
+    warmup_calendar(horizon, start)
+    warmup_locales()
+    warmup_models()
+
+    duration = time.perf_counter() - started_at
+    logger.info(f"Widgets warmup took {duration * 1000:.1f} ms")
+    return duration
+
+
+def warmup_templates() -> None:
+    """Compile all templates and render them once."""
+
+    for directory in strings.lookup.directories:
+        for template_name in sorted(os.listdir(directory)):
+            if template_name.endswith(".mako"):
+                strings.lookup.get_template(template_name)
+
+    for template in (
+        strings.PAGINATION_BACKWARD_BTN_TEMPLATE,
+        strings.PAGINATION_FORWARD_BTN_TEMPLATE,
+    ):
+        template.format(left_num=1, right_num=2)
+
+
+def warmup_calendar(
+    horizon: int = DEFAULT_HORIZON, start: Optional[date] = None
+) -> None:
+    """Cache month grids of horizon and static rows of calendar."""
+
+    month_start = (start or date.today()).replace(day=1)
+    for month_shift in range(horizon):
+        month = month_start + relativedelta(months=month_shift)
+        get_month_weeks(month.year, month.month)
+
+    get_weekdays_row(tuple(CalendarWidget.WEEKDAYS))
+
+
+def warmup_locales() -> None:
+    """Render templates and build static rows of all registered locales."""
+
+    for locale in locales.values():
+        for template_name in (
+            "PAGINATION_BACKWARD_BTN_TEMPLATE",
+            "PAGINATION_FORWARD_BTN_TEMPLATE",
+        ):
+            locale[template_name].format(left_num=1, right_num=2)
+
+        get_weekdays_row(tuple(locale.localize(CalendarWidget).WEEKDAYS))
+
+
+def warmup_models() -> None:
+    """Set up validators of models which are created on every request."""
+
+    CheckboxContent(label="", command="", checkbox_value="", mapping={"": ""})
+    BubbleElement(label="", command="", data={})